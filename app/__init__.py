@@ -5,6 +5,15 @@ import os
 from flask import Flask
 
 from .extensions import db
+from .db_engine import configure_engine
+from .compression import init_compression
+from .ingest import init_ingest
+from .metrics import init_metrics
+from .query_budget import init_query_budget
+from .page_cache import init_page_cache
+from .static_assets import init_static_assets
+from .storage import init_storage
+from .uploads import init_uploads
 from .routes import site_bp
 from .admin import admin
 from . import models  # <- IMPORTANTE: garante que todos os models sejam registrados
@@ -31,29 +40,45 @@ def create_app() -> Flask:
             ADMIN_PASSWORD=os.environ.get("ADMIN_PASSWORD", "admin"),
         )
 
-    # Extensões
+    # Extensões (perfil do pool definido antes de criar a engine)
+    configure_engine(app)
     db.init_app(app)
-
-    from app.extensions import init_supabase
-    init_supabase()
+    init_page_cache(app)
+    init_ingest(app)
+    init_metrics(app)  # antes da compressão: mede os bytes já comprimidos
+    init_query_budget(app)
+    init_compression(app)
+    init_static_assets(app)
 
 # --- Uploads: em serverless só /tmp é gravável ---
     tmp_root = os.environ.get("TMPDIR") or "/tmp"
     app.config["UPLOAD_DIR"] = os.environ.get("UPLOAD_DIR", os.path.join(tmp_root, "uploads"))
+    # variantes derivadas das imagens das categorias (cache descartável)
+    app.config["IMAGE_CACHE_DIR"] = os.environ.get(
+        "IMAGE_CACHE_DIR", os.path.join(app.config["UPLOAD_DIR"], "variants")
+    )
     try:
         os.makedirs(app.config["UPLOAD_DIR"], exist_ok=True)
     except OSError:
         pass
+    init_storage(app)  # depois de UPLOAD_DIR (padrão do backend local)
+    init_uploads(app)
 
 
-    # Cria as tabelas na subida do app (inclui FaqItem etc.)
-    with app.app_context():
-        try:
-            db.create_all()
-        except Exception as e:
-            # Evita travar o boot caso banco não esteja pronto ainda;
-            # os logs do Gunicorn mostrarão o warning abaixo.
-            app.logger.warning(f"db.create_all() falhou na inicialização: {e}")
+    # Schema: gerenciado por scripts/init_db.py, nunca no caminho de boot.
+    # DB_AUTO_MIGRATE=1 (dev) aplica as migrações; DB_SCHEMA_CHECK=1 só
+    # confere a versão (uma query) e avisa nos logs.
+    if app.config.get("DB_AUTO_MIGRATE") or app.config.get("DB_SCHEMA_CHECK"):
+        from .migrations import check_schema, upgrade
+        with app.app_context():
+            try:
+                if app.config.get("DB_AUTO_MIGRATE"):
+                    upgrade(log=app.logger.info)
+                else:
+                    check_schema(app.logger)
+            except Exception as e:
+                # Evita travar o boot caso banco não esteja pronto ainda
+                app.logger.warning(f"checagem de schema falhou na inicialização: {e}")
 
     # Blueprints
     app.register_blueprint(site_bp)                      # público
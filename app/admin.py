@@ -1,11 +1,9 @@
 ﻿from __future__ import annotations
-import psycopg2
 import re
 import time
 from functools import wraps
 from urllib.parse import quote
 from .models import FaqItem
-from app.extensions import supabase
 import os
 import uuid
 import pathlib
@@ -19,11 +17,28 @@ from flask import (
     redirect,
     render_template,
     request,
+    stream_with_context,
     url_for,
 )
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 
 from .extensions import db
+from .cache import cache_stats, invalidate
+from .db_engine import pool_stats
+from .ingest import get_flusher
+from .metrics import request_metrics
+from .query_budget import query_budget
+from .faq import search_text as faq_search_text
+from .analytics import analytics_filters, demand_report, ensure_fresh, watermark_info
+from .crm import (
+    EXPORT_COLUMNS, PAGE_SIZE, QUOTE_STATUSES, estimate_count, iter_export_rows,
+    keyset_page, quote_filters, stream_csv, stream_ndjson,
+)
+from .page_cache import get_page_cache
+from .routes import GRID_IMAGE_WIDTHS, home_grid
+from .storage import save_category_image
+from .uploads import ALLOWED_IMG_EXTS, UploadError, process_upload
 from sqlalchemy.exc import ProgrammingError, OperationalError
 from .models import (
     FeaturedCategory,   # Usamos como "Carros"
@@ -45,10 +60,6 @@ except OSError:
     # Em teoria não deve falhar em /tmp; se falhar, ignora para não quebrar a função
     pass
 
-ALLOWED_IMG_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-
-import psycopg2
-from werkzeug.utils import secure_filename
 import uuid
 import pathlib
 
@@ -69,6 +80,8 @@ def _save_uploaded_image(file_storage) -> str:
 
     # Conectar ao banco de dados PostgreSQL
     try:
+        import psycopg2  # import tardio: fora do cold start
+
         connection = psycopg2.connect(
             dbname="your_db_name",  # Substitua com o nome do seu banco de dados
             user="your_db_user",  # Substitua com o usuário do banco de dados
@@ -106,6 +119,8 @@ def _save_uploaded_image(file_storage) -> str:
 
 def get_image_from_db(category_name):
     try:
+        import psycopg2  # import tardio: fora do cold start
+
         connection = psycopg2.connect(
             dbname="your_db_name", 
             user="your_db_user", 
@@ -148,6 +163,14 @@ admin = Blueprint(
 )
 
 
+@admin.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    # MAX_CONTENT_LENGTH estourado durante o parse do multipart
+    limit = current_app.config.get("UPLOAD_MAX_BYTES", 0) // (1024 * 1024)
+    flash(f"Imagem recusada: arquivo maior que {limit} MB", "danger")
+    return redirect(url_for("admin.categories_list"))
+
+
 
 
 # ---------- Auth ----------
@@ -205,6 +228,32 @@ def settings_json():
 def settings_whatsapp_plain():
     return _digits_only(_get_whatsapp_number_raw()), 200, {"Content-Type": "text/plain; charset=utf-8"}
 
+# ---------- Monitoramento ----------
+@admin.get("/stats.json")
+@requires_auth
+def stats_json():
+    # contadores de hit/miss dos caches em memória (por worker)
+    page_cache = get_page_cache()
+    flusher = get_flusher()
+    return jsonify({
+        "pid": os.getpid(),
+        "caches": cache_stats(),
+        "page_cache": page_cache.stats() if page_cache else None,
+        "ingest": flusher.stats() if flusher else None,
+        "slow_queries": request_metrics.recent_slow(),
+        "pool": dict(
+            pool_stats.snapshot(),
+            profile=current_app.config.get("DB_ENGINE_PROFILE"),
+            status=db.engine.pool.status(),
+        ),
+    })
+
+@admin.get("/metrics")
+@requires_auth
+def metrics():
+    # formato texto do Prometheus (por worker; ver app/metrics.py)
+    return Response(request_metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+
 # ---------- CATEGORIAS (Carros) ----------
 @admin.get("/categories")
 @requires_auth
@@ -232,13 +281,17 @@ def categories_new():
 
     file = request.files.get("image_file")
     if file and getattr(file, "filename", ""):
-        data = file.read()
-        if data:
-            c.image = data
-            c.image_url = None  # desativa caminho antigo
+        try:
+            data = process_upload(file)  # validada, sem EXIF, lado <= IMAGE_MAX_SIDE
+        except UploadError as e:
+            db.session.rollback()
+            flash(f"Imagem recusada: {e}", "danger")
+            return redirect(url_for("admin.categories_list"))
+        save_category_image(c, data, GRID_IMAGE_WIDTHS)  # storage (ou blob) + hash/mime
 
     db.session.add(c)
     db.session.commit()
+    home_grid.refresh()
     flash("Categoria adicionada.", "success")
     return redirect(url_for("admin.categories_list"))
 
@@ -249,6 +302,7 @@ def categories_toggle(cid: int):
     c = FeaturedCategory.query.get_or_404(cid)
     c.active = not c.active
     db.session.commit()
+    home_grid.refresh()
     return redirect(url_for("admin.categories_list"))
 
 
@@ -258,6 +312,7 @@ def categories_delete(cid: int):
     c = FeaturedCategory.query.get_or_404(cid)
     db.session.delete(c)
     db.session.commit()
+    home_grid.refresh()
     flash("Categoria excluída.", "warning")
     return redirect(url_for("admin.categories_list"))
 
@@ -273,12 +328,16 @@ def categories_update(cid: int):
 
     file = request.files.get("image_file")
     if file and getattr(file, "filename", ""):
-        data = file.read()
-        if data:
-            c.image = data
-            c.image_url = None  # desativa caminho antigo
+        try:
+            data = process_upload(file)  # validada, sem EXIF, lado <= IMAGE_MAX_SIDE
+        except UploadError as e:
+            db.session.rollback()
+            flash(f"Imagem recusada: {e}", "danger")
+            return redirect(url_for("admin.categories_list"))
+        save_category_image(c, data, GRID_IMAGE_WIDTHS)  # storage (ou blob) + hash/mime
 
     db.session.commit()
+    home_grid.refresh()
     flash("Categoria atualizada.", "success")
     return redirect(url_for("admin.categories_list"))
 
@@ -286,12 +345,85 @@ def categories_update(cid: int):
 # ---------- CRM ----------
 @admin.get("/crm")
 @requires_auth
+@query_budget(3)
 def crm_page():
-    rows = QuoteRequest.query.order_by(QuoteRequest.created_at.desc()).all()
-    return render_template("crm_quotes.html", items=rows)
+    # keyset em (created_at, id) + filtros; nunca carrega a tabela inteira
+    conds, filters = quote_filters(request.args)
+    per = request.args.get("per", PAGE_SIZE, type=int)
+    rows, next_cursor, prev_cursor = keyset_page(
+        conds,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per=per,
+    )
+    total, approx = estimate_count(conds)
+    return render_template(
+        "crm_quotes.html",
+        items=rows,
+        filters=filters,
+        statuses=QUOTE_STATUSES,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        # tamanho de página não padrão segue nos links de paginação
+        per=per if per != PAGE_SIZE else None,
+        total=total,
+        total_approx=approx,
+    )
+
+# ---------- Análise da demanda (rollups) ----------
+@admin.get("/analytics")
+@requires_auth
+@query_budget(16)
+def analytics_page():
+    ensure_fresh()
+    conds, filters = analytics_filters(request.args)
+    return render_template(
+        "admin_analytics.html",
+        report=demand_report(conds),
+        filters=filters,
+        watermark=watermark_info(),
+    )
+
+
+@admin.get("/analytics.json")
+@requires_auth
+@query_budget(16)
+def analytics_json():
+    ensure_fresh()
+    conds, filters = analytics_filters(request.args)
+    return jsonify(filters=filters, watermark=watermark_info(), **demand_report(conds))
+
+
+@admin.get("/crm/export")
+@requires_auth
+def crm_export():
+    """
+    ?kind=quotes|contacts&format=csv|ndjson (+ os filtros da listagem, para quotes).
+    Resposta em streaming: a memória não cresce com o número de linhas.
+    """
+    kind = request.args.get("kind", "quotes")
+    fmt = request.args.get("format", "csv")
+    if kind not in EXPORT_COLUMNS or fmt not in ("csv", "ndjson"):
+        return jsonify(ok=False, error="kind=quotes|contacts e format=csv|ndjson"), 400
+
+    conds = quote_filters(request.args)[0] if kind == "quotes" else []
+    rows = iter_export_rows(kind, conds)
+    if fmt == "csv":
+        body, mimetype = stream_csv(kind, rows), "text/csv"
+    else:
+        body, mimetype = stream_ndjson(kind, rows), "application/x-ndjson"
+
+    filename = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
 
 @admin.get("/crm/cotacoes")
 @requires_auth
+@query_budget(3)
 def crm_cotacoes():
     return crm_page()
 
@@ -353,6 +485,7 @@ def locations_new():
         return redirect(url_for("admin.locations_list"))
     db.session.add(Location(name=name, position=pos, active=True))
     db.session.commit()
+    invalidate("locations")
     flash("Localidade adicionada.", "success")
     return redirect(url_for("admin.locations_list"))
 
@@ -363,6 +496,7 @@ def locations_update(lid: int):
     loc.name = (request.form.get("name") or loc.name).strip()
     loc.position = int(request.form.get("position") or loc.position)
     db.session.commit()
+    invalidate("locations")
     flash("Localidade atualizada.", "success")
     return redirect(url_for("admin.locations_list"))
 
@@ -372,6 +506,7 @@ def locations_toggle(lid: int):
     loc = Location.query.get_or_404(lid)
     loc.active = not loc.active
     db.session.commit()
+    invalidate("locations")
     return redirect(url_for("admin.locations_list"))
 
 @admin.post("/locations/<int:lid>/delete")
@@ -380,6 +515,7 @@ def locations_delete(lid: int):
     loc = Location.query.get_or_404(lid)
     db.session.delete(loc)
     db.session.commit()
+    invalidate("locations")
     flash("Localidade excluída.", "warning")
     return redirect(url_for("admin.locations_list"))
 
@@ -398,9 +534,10 @@ def admin_legal_post():
     terms_html = request.form.get("terms_html", "")
     privacy = LegalPage.get_or_create("privacy", "Política de Privacidade")
     terms = LegalPage.get_or_create("terms", "Termos de Uso")
-    privacy.html = privacy_html
-    terms.html = terms_html
+    privacy.set_html(privacy_html)
+    terms.set_html(terms_html)
     db.session.commit()
+    invalidate("legal")
     flash("Páginas salvas.", "success")
     return redirect(url_for("admin.admin_legal_get"))
 
@@ -416,8 +553,9 @@ def admin_legal_edit(key):
 
     if request.method == "POST":
         page.title = (request.form.get("title") or page.title).strip() or page.title
-        page.html = request.form.get("html", "")
+        page.set_html(request.form.get("html", ""))
         db.session.commit()
+        invalidate("legal")
         flash("Página atualizada!", "success")
         return redirect(url_for("admin.admin_legal_edit", key=key))
 
@@ -440,9 +578,11 @@ def admin_faq_new():
     if not q:
         flash('Informe a pergunta.', 'danger')
         return redirect(url_for('admin.admin_faq_list'))
-    item = FaqItem(question=q, answer=a, position=pos, active=active)
+    item = FaqItem(question=q, answer=a, position=pos, active=active,
+                   search_text=faq_search_text(q, a))
     db.session.add(item)
     db.session.commit()
+    invalidate('faq')
     flash('Pergunta adicionada.', 'success')
     return redirect(url_for('admin.admin_faq_list'))
 
@@ -455,7 +595,9 @@ def admin_faq_update(fid:int):
     item.position = int(request.form.get('position') or item.position)
     if 'active' in request.form:
         item.active = bool(request.form.get('active'))
+    item.search_text = faq_search_text(item.question, item.answer)
     db.session.commit()
+    invalidate('faq')
     flash('Pergunta atualizada.', 'success')
     return redirect(url_for('admin.admin_faq_list'))
 
@@ -465,6 +607,7 @@ def admin_faq_toggle(fid:int):
     item = FaqItem.query.get_or_404(fid)
     item.active = not item.active
     db.session.commit()
+    invalidate('faq')
     return redirect(url_for('admin.admin_faq_list'))
 
 @admin.post('/faq/<int:fid>/delete')
@@ -473,6 +616,7 @@ def admin_faq_delete(fid:int):
     item = FaqItem.query.get_or_404(fid)
     db.session.delete(item)
     db.session.commit()
+    invalidate('faq')
     flash('Pergunta removida.', 'warning')
     return redirect(url_for('admin.admin_faq_list'))
 
@@ -480,8 +624,10 @@ def admin_faq_delete(fid:int):
 @admin.get("/faq/init")
 @requires_auth
 def admin_faq_init():
+    from .migrations import upgrade
     try:
-        db.create_all()
+        # mesmo caminho do scripts/init_db.py (create_all + migrações)
+        upgrade(log=current_app.logger.info)
         flash("Tabelas criadas/atualizadas.", "success")
     except Exception as e:
         flash(f"Erro ao criar tabelas: {e}", "danger")
@@ -0,0 +1,232 @@
+"""
+Análise da demanda: rollups diários de quote_requests.
+
+quote_daily_rollups guarda contagens por (dia, categoria, local de
+retirada, origem, status, faixa de antecedência). A atualização é
+incremental: só os dias com cotações de id acima do watermark, mais os
+últimos ROLLUP_REFRESH_DAYS dias (onde o status ainda muda), são
+recalculados, cada intervalo com um DELETE + INSERT ... SELECT no banco.
+As consultas do admin leem só o rollup (centenas de linhas por mês).
+
+Atualização: scripts/rollup_quotes.py (cron) e, sob demanda, na leitura do
+admin quando a última passada tem mais de ROLLUP_MAX_AGE segundos.
+"""
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any
+
+from sqlalchemy import DateTime, bindparam, func, select, text
+
+from .extensions import db
+from .models import QuoteDailyRollup, QuoteRequest, RollupWatermark
+
+WATERMARK = "quote_daily"
+REFRESH_DAYS = int(os.environ.get("ROLLUP_REFRESH_DAYS", "30"))
+MAX_AGE = float(os.environ.get("ROLLUP_MAX_AGE", "300"))
+
+# faixas de antecedência (dias entre o pedido e a retirada)
+LEAD_BUCKETS = (
+    ("<0", None, -1),
+    ("0-2", 0, 2),
+    ("3-7", 3, 7),
+    ("8-14", 8, 14),
+    ("15-30", 15, 30),
+    ("31-60", 31, 60),
+    ("61+", 61, None),
+)
+LEAD_UNKNOWN = "?"
+BUCKET_ORDER = [b[0] for b in LEAD_BUCKETS] + [LEAD_UNKNOWN]
+
+
+# ---------- agregação (no banco) ----------
+def _dialect_exprs() -> tuple[str, str]:
+    """(dia de created_at, pickup_on - dia de created_at em dias) por dialeto."""
+    if db.engine.dialect.name == "postgresql":
+        return "CAST(created_at AS DATE)", "(pickup_on - CAST(created_at AS DATE))"
+    return (
+        "date(created_at)",
+        "CAST(julianday(pickup_on) - julianday(date(created_at)) AS INTEGER)",
+    )
+
+
+def _bucket_case() -> str:
+    parts = [f"WHEN lead IS NULL THEN '{LEAD_UNKNOWN}'"]
+    for label, _, hi in LEAD_BUCKETS:
+        if hi is not None:
+            parts.append(f"WHEN lead <= {hi} THEN '{label}'")
+        else:
+            parts.append(f"ELSE '{label}'")
+    return "CASE " + " ".join(parts) + " END"
+
+
+def _rollup_range(start: date, end: date) -> int:
+    """Recalcula os dias [start, end). Retorna o número de linhas do rollup."""
+    day_expr, lead_expr = _dialect_exprs()
+    params = {
+        "s": datetime.combine(start, dtime.min),
+        "e": datetime.combine(end, dtime.min),
+    }
+    typed = [bindparam("s", type_=DateTime), bindparam("e", type_=DateTime)]
+
+    db.session.execute(
+        text("DELETE FROM quote_daily_rollups WHERE day >= :ds AND day < :de"),
+        {"ds": start, "de": end},
+    )
+    result = db.session.execute(
+        text(f"""
+            INSERT INTO quote_daily_rollups
+                (day, category, pickup_place, source, status, lead_bucket, count, lead_days_sum)
+            SELECT day, category, pickup_place, source, status, {_bucket_case()},
+                   COUNT(*), COALESCE(SUM(lead), 0)
+            FROM (
+                SELECT {day_expr} AS day,
+                       COALESCE(category, '') AS category,
+                       COALESCE(pickup_place, '') AS pickup_place,
+                       COALESCE(source, '') AS source,
+                       COALESCE(status, '') AS status,
+                       {lead_expr} AS lead
+                FROM quote_requests
+                WHERE created_at >= :s AND created_at < :e
+            ) q
+            GROUP BY 1, 2, 3, 4, 5, 6
+        """).bindparams(*typed),
+        params,
+    )
+    return result.rowcount or 0
+
+
+def refresh_rollups(full: bool = False, log=None) -> dict[str, Any]:
+    """
+    Atualização incremental (ou completa com full=True). Idempotente.
+    """
+    if db.engine.dialect.name == "postgresql":
+        # uma atualização por vez (cron + leitura do admin podem coincidir)
+        db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext('quote_daily_rollups'))"))
+    wm = db.session.get(RollupWatermark, WATERMARK)
+    if wm is None:
+        wm = RollupWatermark(name=WATERMARK, last_id=0)
+        db.session.add(wm)
+        full = True
+
+    max_id = db.session.execute(select(func.max(QuoteRequest.id))).scalar() or 0
+    today = datetime.utcnow().date()
+    tomorrow = today + timedelta(days=1)
+
+    ranges: list[tuple[date, date]] = []
+    if full:
+        first = db.session.execute(select(func.min(QuoteRequest.created_at))).scalar()
+        if first is not None:
+            ranges.append((first.date(), tomorrow))
+        db.session.execute(text("DELETE FROM quote_daily_rollups"))
+    else:
+        window_start = today - timedelta(days=REFRESH_DAYS)
+        # dias antigos com linhas novas (ex.: importação retroativa)
+        old_days = db.session.execute(
+            select(func.min(QuoteRequest.created_at), func.max(QuoteRequest.created_at))
+            .where(QuoteRequest.id > wm.last_id)
+        ).one()
+        if old_days[0] is not None and old_days[0].date() < window_start:
+            ranges.append((old_days[0].date(), min(old_days[1].date() + timedelta(days=1), window_start)))
+        ranges.append((window_start, tomorrow))
+
+    rows = sum(_rollup_range(s, e) for s, e in ranges)
+    wm.last_id = max_id
+    wm.refreshed_at = datetime.utcnow()
+    db.session.commit()
+
+    info = {"ranges": [(s.isoformat(), e.isoformat()) for s, e in ranges], "rows": rows, "last_id": max_id}
+    if log:
+        log(f"[analytics] rollup atualizado: {info}")
+    return info
+
+
+def ensure_fresh() -> bool:
+    """Atualiza se a última passada for mais velha que MAX_AGE (ou houver ids novos)."""
+    wm = db.session.get(RollupWatermark, WATERMARK)
+    if wm is not None and wm.refreshed_at is not None:
+        age = (datetime.utcnow() - wm.refreshed_at).total_seconds()
+        if age < MAX_AGE:
+            return False
+        max_id = db.session.execute(select(func.max(QuoteRequest.id))).scalar() or 0
+        if max_id <= wm.last_id and age < MAX_AGE * 12:
+            return False
+    refresh_rollups()
+    return True
+
+
+# ---------- consultas (só o rollup) ----------
+def analytics_filters(args) -> tuple[list, dict[str, str]]:
+    today = datetime.utcnow().date()
+    end = _parse_day(args.get("end")) or today
+    start = _parse_day(args.get("start")) or (end - timedelta(days=89))
+    R = QuoteDailyRollup
+    conds = [R.day >= start, R.day <= end]
+    active = {"start": start.isoformat(), "end": end.isoformat()}
+    for field in ("category", "pickup_place", "source"):
+        value = (args.get(field) or "").strip()
+        if value:
+            conds.append(getattr(R, field) == value)
+            active[field] = value
+    return conds, active
+
+
+def _parse_day(value) -> date | None:
+    try:
+        return date.fromisoformat((value or "").strip())
+    except ValueError:
+        return None
+
+
+def _grouped(conds, column, limit: int | None = None) -> list[dict[str, Any]]:
+    R = QuoteDailyRollup
+    total = func.sum(R.count).label("n")
+    q = select(column, total).where(*conds).group_by(column).order_by(total.desc())
+    if limit:
+        q = q.limit(limit)
+    return [{"key": k or "", "count": int(n)} for k, n in db.session.execute(q)]
+
+
+def demand_report(conds) -> dict[str, Any]:
+    R = QuoteDailyRollup
+    by_day = [
+        {"day": d.isoformat() if isinstance(d, date) else str(d), "count": int(n)}
+        for d, n in db.session.execute(
+            select(R.day, func.sum(R.count)).where(*conds).group_by(R.day).order_by(R.day)
+        )
+    ]
+    by_status = {k["key"]: k["count"] for k in _grouped(conds, R.status)}
+    total = sum(by_status.values())
+
+    lead = {k["key"]: k["count"] for k in _grouped(conds, R.lead_bucket)}
+    known, lead_sum = db.session.execute(
+        select(func.sum(R.count), func.sum(R.lead_days_sum))
+        .where(*conds, R.lead_bucket != LEAD_UNKNOWN)
+    ).one()
+
+    return {
+        "total": total,
+        "by_day": by_day,
+        "by_category": _grouped(conds, R.category),
+        "by_pickup_place": _grouped(conds, R.pickup_place, limit=25),
+        "by_source": _grouped(conds, R.source),
+        "by_status": by_status,
+        "conversion": {
+            status: round(n / total, 4) if total else 0.0 for status, n in by_status.items()
+        },
+        "lead_time": {
+            "buckets": [{"key": b, "count": lead.get(b, 0)} for b in BUCKET_ORDER],
+            "avg_days": round(lead_sum / known, 1) if known else None,
+        },
+    }
+
+
+def watermark_info() -> dict[str, Any] | None:
+    wm = db.session.get(RollupWatermark, WATERMARK)
+    if wm is None:
+        return None
+    return {
+        "last_id": wm.last_id,
+        "refreshed_at": wm.refreshed_at.isoformat() if wm.refreshed_at else None,
+    }
@@ -0,0 +1,200 @@
+"""
+Cache em memória (por processo) com invalidação entre workers.
+
+Cada namespace ("settings", "categories", ...) tem um carimbo de versão na
+tabela cache_versions. Os caches locais servem da memória por `ttl`
+segundos; depois disso fazem uma consulta barata ao carimbo e só recarregam
+se ele mudou. invalidate() incrementa o carimbo, então todos os workers do
+gunicorn e instâncias serverless enxergam a mudança sem reiniciar.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from flask import current_app, g, has_request_context
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .extensions import db
+
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "30"))
+
+_MISSING = object()
+_registry: dict[str, list["VersionedCache"]] = {}
+_listeners: dict[str, list[Callable[[str], None]]] = {}
+
+
+# ---------- carimbos de versão ----------
+def read_versions(namespaces) -> dict[str, int]:
+    """
+    Lê os carimbos de vários namespaces numa única query.
+    """
+    from .models import CacheVersion
+
+    try:
+        rows = db.session.execute(
+            db.select(CacheVersion.key, CacheVersion.version)
+            .where(CacheVersion.key.in_(list(namespaces)))
+        ).all()
+    except SQLAlchemyError as e:
+        # tabela ainda não criada (rodar scripts/init_db.py): não derruba a página
+        db.session.rollback()
+        current_app.logger.warning(f"cache_versions indisponível: {e}")
+        return {ns: 0 for ns in namespaces}
+    found = dict(rows)
+    versions = {ns: found.get(ns) or 0 for ns in namespaces}
+    if has_request_context():
+        g.setdefault("_cache_versions", {}).update(versions)
+    return versions
+
+
+def read_version(namespace: str) -> int:
+    # já lido nesta requisição (ex.: pelo page_cache): não repete a query
+    if has_request_context():
+        seen = g.get("_cache_versions")
+        if seen and namespace in seen:
+            return seen[namespace]
+    return read_versions([namespace])[namespace]
+
+
+# versões lidas recentemente (por processo): ns -> (válido_até, versão)
+_versions_memo: dict[str, tuple[float, int]] = {}
+
+
+def current_versions(namespaces, max_age: float) -> dict[str, int]:
+    """
+    Como read_versions, mas reaproveita leituras com menos de `max_age`
+    segundos; consulta o banco só para os namespaces vencidos.
+    """
+    now = time.monotonic()
+    stale = [ns for ns in namespaces if _versions_memo.get(ns, (0.0, 0))[0] <= now]
+    if stale:
+        for ns, v in read_versions(stale).items():
+            _versions_memo[ns] = (now + max_age, v)
+    return {ns: _versions_memo[ns][1] for ns in namespaces}
+
+
+def on_invalidate(namespace: str, callback: Callable[[str], None]) -> None:
+    """
+    Registra um callback local chamado quando `namespace` é invalidado
+    neste processo (ex.: purga seletiva do cache de páginas).
+    """
+    _listeners.setdefault(namespace, []).append(callback)
+
+
+def bump_version(namespace: str) -> None:
+    from .models import CacheVersion
+
+    for _ in range(2):
+        n = CacheVersion.query.filter_by(key=namespace).update(
+            {CacheVersion.version: CacheVersion.version + 1}
+        )
+        if not n:
+            db.session.add(CacheVersion(key=namespace, version=1))
+        try:
+            db.session.commit()
+            return
+        except IntegrityError:
+            # outro worker criou a linha ao mesmo tempo: repete como UPDATE
+            db.session.rollback()
+
+
+def invalidate(namespace: str) -> None:
+    """
+    Marca o namespace como alterado (no banco) e limpa os caches locais dele.
+    Chamar depois do commit da alteração.
+    """
+    bump_version(namespace)
+    _versions_memo.pop(namespace, None)
+    if has_request_context():
+        g.get("_cache_versions", {}).pop(namespace, None)
+    for cache in _registry.get(namespace, []):
+        cache.clear()
+    for callback in _listeners.get(namespace, []):
+        callback(namespace)
+
+
+# ---------- cache ----------
+class VersionedCache:
+    def __init__(self, namespace: str, loader: Callable[[], Any], ttl: float | None = None):
+        self.namespace = namespace
+        self.loader = loader
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._value: Any = _MISSING
+        self._version: int | None = None
+        self._fresh_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.checks = 0
+        _registry.setdefault(namespace, []).append(self)
+
+    def get(self) -> Any:
+        value = self._value
+        if value is not _MISSING and time.monotonic() < self._fresh_until:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            # outro thread pode ter revalidado enquanto esperávamos o lock
+            if self._value is not _MISSING and time.monotonic() < self._fresh_until:
+                self.hits += 1
+                return self._value
+
+            # versão lida ANTES de carregar: se mudar no meio, a próxima
+            # checagem recarrega (nunca fica preso a dados velhos)
+            version = read_version(self.namespace)
+            self.checks += 1
+            if self._value is not _MISSING and version == self._version:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._value = self.loader()
+                self._version = version
+            self._fresh_until = time.monotonic() + self.ttl
+            return self._value
+
+    @property
+    def version(self) -> int | None:
+        """Carimbo do valor em memória (None antes do primeiro get)."""
+        return self._version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = _MISSING
+            self._version = None
+            self._fresh_until = 0.0
+
+    def invalidate(self) -> None:
+        invalidate(self.namespace)
+
+    def refresh(self) -> Any:
+        """
+        Invalida e já reconstrói o valor neste worker (os demais
+        recarregam na próxima checagem de versão).
+        """
+        self.invalidate()
+        return self.get()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "version_checks": self.checks,
+            "version": self._version,
+            "loaded": self._value is not _MISSING,
+        }
+
+
+def clear_local() -> None:
+    """Esvazia os caches deste processo sem mexer nos carimbos (medições a frio)."""
+    _versions_memo.clear()
+    for caches in _registry.values():
+        for cache in caches:
+            cache.clear()
+
+
+def cache_stats() -> dict[str, list[dict[str, Any]]]:
+    return {ns: [c.stats() for c in caches] for ns, caches in _registry.items()}
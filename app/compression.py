@@ -0,0 +1,90 @@
+"""
+Compressão das respostas dinâmicas (after_request).
+
+Comprime com brotli (se o pacote `brotli` estiver instalado) ou gzip,
+conforme o Accept-Encoding, quando:
+- o tipo está em COMPRESS_MIMETYPES (HTML, CSS, JS, JSON, SVG, XML, texto);
+- o corpo tem pelo menos COMPRESS_MIN_SIZE bytes;
+- a resposta ainda não tem Content-Encoding (páginas do page_cache e
+  estáticos pré-comprimidos já chegam prontos) e não é streaming/arquivo.
+
+ETags fortes viram fracas (W/"..."): o corpo comprimido é outra
+representação, e If-None-Match continua valendo (comparação fraca).
+"""
+from __future__ import annotations
+
+import gzip
+
+from flask import current_app, request
+
+COMPRESS_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/xml", "text/javascript",
+    "application/javascript", "application/json", "application/xml",
+    "application/manifest+json", "image/svg+xml",
+}
+COMPRESS_MIN_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # rápido o bastante para conteúdo dinâmico
+
+_brotli = None
+
+
+def brotli_module():
+    """`brotli` é opcional: None se não estiver instalado."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def choose_encoding(accept_encodings, allow_br: bool = True) -> str | None:
+    if allow_br and accept_encodings["br"] and brotli_module():
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    if encoding == "br":
+        return brotli_module().compress(data, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL if level is None else level)
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config.get("COMPRESS_ENABLED", True):
+        return response
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESS_MIMETYPES
+        or "no-transform" in (response.headers.get("Cache-Control") or "")
+        or request.method == "HEAD"
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < int(config.get("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)):
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app) -> None:
+    app.after_request(compress_response)
@@ -9,6 +9,49 @@ class Config:
     ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
     ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "Mauro@2025")
 
+    # Schema: aplicar migrações no boot (só dev) / apenas conferir a versão
+    DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE") == "1"
+    DB_SCHEMA_CHECK = os.environ.get("DB_SCHEMA_CHECK") == "1"
+
+    # Cache de páginas públicas: memory | filesystem | off
+    PAGE_CACHE_BACKEND = os.environ.get("PAGE_CACHE_BACKEND", "memory")
+    PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR")
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", "128"))
+    PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", "5"))
+
+    # Formulários públicos: sync (COMMIT na requisição) | queue (fila local + lotes)
+    INGEST_MODE = os.environ.get("INGEST_MODE", "sync")
+    INGEST_QUEUE_PATH = os.environ.get("INGEST_QUEUE_PATH")
+
+    # Compressão das respostas dinâmicas (app/compression.py)
+    COMPRESS_ENABLED = os.environ.get("COMPRESS_ENABLED", "1") != "0"
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+
+    # Métricas por requisição (/admin/metrics) e log de queries lentas (app/metrics.py)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+    METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING") == "1"
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+    # Orçamento de queries por view / detector de N+1: off | warn | strict (app/query_budget.py)
+    QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "off")
+    QUERY_BUDGET_DEFAULT = int(os.environ["QUERY_BUDGET_DEFAULT"]) if os.environ.get("QUERY_BUDGET_DEFAULT") else None
+
+    # Imagens das categorias: db | local | s3 | supabase | memory (app/storage.py)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "db")
+    STORAGE_PUBLIC_URL = os.environ.get("STORAGE_PUBLIC_URL")  # CDN / bucket público
+    STORAGE_LOCAL_DIR = os.environ.get("STORAGE_LOCAL_DIR")
+    STORAGE_S3_BUCKET = os.environ.get("STORAGE_S3_BUCKET")
+    STORAGE_S3_ENDPOINT_URL = os.environ.get("STORAGE_S3_ENDPOINT_URL")
+    STORAGE_S3_REGION = os.environ.get("STORAGE_S3_REGION")
+    SUPABASE_BUCKET = os.environ.get("SUPABASE_BUCKET")
+
+    # Uploads do admin (app/uploads.py): limites e normalização das imagens
+    UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_MB", "20")) * 1024 * 1024
+    MAX_CONTENT_LENGTH = UPLOAD_MAX_BYTES + 1024 * 1024  # arquivo + campos do formulário
+    UPLOAD_SPOOL_BYTES = 1024 * 1024  # acima disso o arquivo vai para disco
+    IMAGE_MAX_SIDE = int(os.environ.get("IMAGE_MAX_SIDE", "1920"))
+    IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", "50000000"))
+    UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "2"))
+
 TMP_ROOT = os.environ.get("TMPDIR") or "/tmp"
 DEFAULT_UPLOAD_DIR = os.path.join(TMP_ROOT, "uploads")
 UPLOAD_DIR = os.environ.get("UPLOAD_DIR", DEFAULT_UPLOAD_DIR)
@@ -0,0 +1,233 @@
+"""
+Consultas do CRM de cotações: filtros, paginação por keyset e contagem
+estimada. Compartilhado pela listagem do admin e pelas exportações.
+
+A paginação usa (created_at, id) como chave, coberta pelos índices
+compostos de QuoteRequest: cada página é um range scan de `per` linhas,
+independentemente de quantas cotações existem.
+
+A exportação (CSV/NDJSON) percorre a mesma chave em blocos de
+EXPORT_CHUNK linhas, cada bloco numa transação curta: a conexão volta ao
+pool entre os blocos, então nenhuma transação fica aberta no pgbouncer
+durante o download e a memória não cresce com o tamanho da exportação.
+"""
+from __future__ import annotations
+
+import base64
+import csv
+import io
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Iterator
+
+from sqlalchemy import func, select, text, tuple_
+
+from .extensions import db
+from .models import ContactMessage, QuoteRequest
+
+QUOTE_STATUSES = ("novo", "em_contato", "concluido")
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# acima disso a contagem vira "N+" (evita COUNT(*) completo)
+COUNT_CAP = 10_000
+EXPORT_CHUNK = 1000
+
+# colunas exportadas (sem ingest_key/fingerprint, que são internas)
+EXPORT_COLUMNS = {
+    "quotes": (
+        "id", "created_at", "status", "name", "phone", "category",
+        "pickup_place", "pickup_date", "pickup_on", "drop_place", "drop_date", "drop_on",
+        "source", "ip_addr", "user_agent",
+    ),
+    "contacts": ("id", "created_at", "name", "email", "message", "ip_addr", "user_agent"),
+}
+EXPORT_MODELS = {"quotes": QuoteRequest, "contacts": ContactMessage}
+_PHONE_LIKE = re.compile(r"^[+-]?[\d\s().-]+$")
+
+
+# ---------- filtros ----------
+def quote_filters(args) -> tuple[list, dict[str, str]]:
+    """
+    Converte a query string (status, category, source, pickup_place,
+    pickup_from, pickup_to) em condições SQL. Devolve também os filtros ativos, para
+    reaproveitar nos links de paginação/exportação.
+    """
+    conds = []
+    active: dict[str, str] = {}
+
+    status = (args.get("status") or "").strip()
+    if status in QUOTE_STATUSES:
+        conds.append(QuoteRequest.status == status)
+        active["status"] = status
+
+    for field in ("category", "source"):
+        value = (args.get(field) or "").strip()
+        if value:
+            conds.append(getattr(QuoteRequest, field) == value)
+            active[field] = value
+
+    # local + intervalo de retirada: range scan em (pickup_place, pickup_on)
+    place = (args.get("pickup_place") or "").strip()
+    if place:
+        conds.append(QuoteRequest.pickup_place == place)
+        active["pickup_place"] = place
+    pickup_from = _iso_date(args.get("pickup_from"))
+    if pickup_from:
+        conds.append(QuoteRequest.pickup_on >= pickup_from)
+        active["pickup_from"] = pickup_from.isoformat()
+    pickup_to = _iso_date(args.get("pickup_to"))
+    if pickup_to:
+        conds.append(QuoteRequest.pickup_on <= pickup_to)
+        active["pickup_to"] = pickup_to.isoformat()
+
+    return conds, active
+
+
+def _iso_date(value) -> date | None:
+    try:
+        return datetime.strptime((value or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+# ---------- cursor ----------
+def encode_cursor(created_at: datetime, qid: int) -> str:
+    raw = f"{created_at.isoformat()}|{qid}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str | None) -> tuple[datetime, int] | None:
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created, qid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created), int(qid)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+# ---------- páginas ----------
+def keyset_page(conds, after: str | None = None, before: str | None = None, per: int = PAGE_SIZE):
+    """
+    Uma página em ordem (created_at desc, id desc).
+    `after` = cursor da última linha vista (página seguinte, mais antigas);
+    `before` = cursor da primeira linha vista (página anterior, mais novas).
+    Retorna (linhas, cursor_seguinte | None, cursor_anterior | None).
+    """
+    per = max(1, min(per, MAX_PAGE_SIZE))
+    key = tuple_(QuoteRequest.created_at, QuoteRequest.id)
+    q = select(QuoteRequest).where(*conds)
+
+    before_key = decode_cursor(before)
+    after_key = decode_cursor(after)
+    if before_key:
+        q = q.where(key > tuple_(*before_key)).order_by(
+            QuoteRequest.created_at.asc(), QuoteRequest.id.asc()
+        )
+    else:
+        if after_key:
+            q = q.where(key < tuple_(*after_key))
+        q = q.order_by(QuoteRequest.created_at.desc(), QuoteRequest.id.desc())
+
+    rows = db.session.execute(q.limit(per + 1)).scalars().all()
+    more = len(rows) > per
+    rows = rows[:per]
+    if before_key:
+        rows.reverse()
+
+    first = encode_cursor(rows[0].created_at, rows[0].id) if rows else None
+    last = encode_cursor(rows[-1].created_at, rows[-1].id) if rows else None
+    if before_key:
+        next_cursor = last
+        prev_cursor = first if more else None
+    else:
+        next_cursor = last if more else None
+        prev_cursor = first if after_key else None
+    return rows, next_cursor, prev_cursor
+
+
+def estimate_count(conds) -> tuple[int, bool]:
+    """
+    (total, é_aproximado). Sem filtros no Postgres usa a estatística do
+    planner (pg_class.reltuples); com filtros conta até COUNT_CAP linhas.
+    """
+    if not conds and db.engine.dialect.name == "postgresql":
+        n = db.session.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = 'quote_requests'"
+        )).scalar()
+        if n is not None and n >= 0:
+            return int(n), True
+
+    capped = select(QuoteRequest.id).where(*conds).limit(COUNT_CAP + 1).subquery()
+    n = db.session.execute(select(func.count()).select_from(capped)).scalar() or 0
+    return min(n, COUNT_CAP), n > COUNT_CAP
+
+
+# ---------- exportação ----------
+def iter_export_rows(kind: str, conds, chunk: int = EXPORT_CHUNK) -> Iterator[dict[str, Any]]:
+    """
+    Linhas (dicts) em ordem (created_at desc, id desc), buscadas por keyset
+    em blocos; a sessão é fechada depois de cada bloco.
+    """
+    model = EXPORT_MODELS[kind]
+    cols = [getattr(model, c) for c in EXPORT_COLUMNS[kind]]
+    key = tuple_(model.created_at, model.id)
+    q = select(*cols).where(*conds).order_by(model.created_at.desc(), model.id.desc()).limit(chunk)
+
+    last = None
+    while True:
+        stmt = q if last is None else q.where(key < tuple_(*last))
+        try:
+            rows = db.session.execute(stmt).mappings().all()
+        finally:
+            db.session.close()  # fim da transação: conexão devolvida ao pool
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk:
+            return
+        last = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    value = str(value)
+    # evita fórmulas ao abrir no Excel/Sheets (dados vêm de formulário público);
+    # telefones como "+1 (407) ..." só têm dígitos e não precisam do escape
+    if value[:1] in ("=", "+", "-", "@", "\t", "\r") and not _PHONE_LIKE.match(value):
+        return "'" + value
+    return value
+
+
+def stream_csv(kind: str, rows: Iterator[dict[str, Any]], flush_every: int = 500) -> Iterator[str]:
+    columns = EXPORT_COLUMNS[kind]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")  # BOM: acentos corretos no Excel
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_cell(row[c]) for c in columns])
+        if i % flush_every == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def stream_ndjson(kind: str, rows: Iterator[dict[str, Any]], flush_every: int = 500) -> Iterator[str]:
+    columns = EXPORT_COLUMNS[kind]
+    lines: list[str] = []
+    for row in rows:
+        lines.append(json.dumps(
+            {c: row[c] for c in columns}, default=lambda v: v.isoformat(), ensure_ascii=False
+        ))
+        if len(lines) >= flush_every:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,221 @@
+"""
+Perfis de engine do SQLAlchemy (pool de conexões) por ambiente.
+
+- serverless: NullPool. Cada instância Vercel abre/fecha a conexão no
+  pgbouncer (porta 6543); manter pool em processo congelado só gera
+  conexões mortas.
+- gunicorn: QueuePool dimensionado pelas threads do worker, com
+  pre_ping/recycle e pré-aquecimento no boot do worker (gunicorn.conf.py).
+- sqlite: desenvolvimento local.
+
+O Supabase pooler na 6543 opera em modo transação: não há prepared
+statements entre transações. psycopg2 não usa prepared statements do
+servidor; com psycopg 3 desligamos explicitamente (prepare_threshold=None).
+
+Escolha via DB_ENGINE_PROFILE (serverless | gunicorn | sqlite); sem a env,
+o perfil é deduzido da URL do banco / ambiente.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, Pool, QueuePool
+
+# ---------- métricas do pool ----------
+# limites (segundos) do histograma de espera no checkout
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.connects = 0        # conexões DBAPI novas
+        self.closes = 0          # conexões DBAPI fechadas
+        self.invalidations = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for i, limit in enumerate(WAIT_BUCKETS):
+                if seconds <= limit:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        n = sum(self.wait_buckets)
+        return {
+            "connects": self.connects,
+            "closes": self.closes,
+            "invalidations": self.invalidations,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "checkout_wait": {
+                "count": n,
+                "total_s": round(self.wait_total, 6),
+                "avg_ms": round(self.wait_total / n * 1000, 3) if n else 0.0,
+                "max_ms": round(self.wait_max * 1000, 3),
+                "buckets": dict(zip([*map(str, WAIT_BUCKETS), "+Inf"], self.wait_buckets)),
+            },
+        }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mede o tempo de espera por uma conexão (inclui o connect
+    quando o pool precisa crescer).
+    """
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_wait(time.perf_counter() - t0)
+
+
+class TimedNullPool(NullPool):
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_wait(time.perf_counter() - t0)
+
+
+# ---------- perfis ----------
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def resolve_profile(uri: str) -> str:
+    profile = (os.environ.get("DB_ENGINE_PROFILE") or "").lower()
+    if profile in ("serverless", "gunicorn", "sqlite"):
+        return profile
+    if uri.startswith("sqlite"):
+        return "sqlite"
+    if os.environ.get("VERCEL") or os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return "serverless"
+    return "gunicorn"
+
+
+def _sqlite_in_memory(uri: str) -> bool:
+    if not uri.startswith("sqlite"):
+        return False
+    database = make_url(uri).database
+    return database in (None, "", ":memory:")
+
+
+def engine_options(profile: str, uri: str) -> dict:
+    if profile == "sqlite":
+        if _sqlite_in_memory(uri):
+            # o Flask-SQLAlchemy força StaticPool (uma conexão compartilhada)
+            return {}
+        return {"poolclass": TimedQueuePool, "pool_size": 5, "max_overflow": 5}
+
+    connect_args = {
+        "connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 5),
+        "application_name": os.environ.get("DB_APPLICATION_NAME", "mdy-web"),
+    }
+    if uri.startswith("postgresql+psycopg://"):
+        # psycopg 3: sem prepared statements (pgbouncer em modo transação)
+        connect_args["prepare_threshold"] = None
+
+    if profile == "serverless":
+        return {"poolclass": TimedNullPool, "connect_args": connect_args}
+
+    # gunicorn: uma conexão por thread do worker + folga pequena
+    threads = _env_int("GUNICORN_THREADS", 4)
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", threads),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 2),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 300),
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,  # conexões ociosas excedentes expiram no pgbouncer
+        "connect_args": connect_args,
+    }
+
+
+# eventos no nível da classe Pool: valem para a engine criada depois, sem
+# precisar instanciá-la (e importar o driver do banco) no boot
+@event.listens_for(Pool, "connect")
+def _on_connect(*_):
+    pool_stats.connects += 1
+
+
+@event.listens_for(Pool, "close")
+@event.listens_for(Pool, "close_detached")
+def _on_close(*_):
+    pool_stats.closes += 1
+
+
+@event.listens_for(Pool, "invalidate")
+def _on_invalidate(*_):
+    pool_stats.invalidations += 1
+
+
+@event.listens_for(Pool, "checkout")
+def _on_checkout(*_):
+    pool_stats.checkouts += 1
+
+
+@event.listens_for(Pool, "checkin")
+def _on_checkin(*_):
+    pool_stats.checkins += 1
+
+
+def configure_engine(app) -> str:
+    """
+    Define SQLALCHEMY_ENGINE_OPTIONS conforme o perfil (antes do db.init_app).
+    Opções já presentes na config têm precedência.
+    """
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+    profile = resolve_profile(uri)
+    options = engine_options(profile, uri)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    app.config["DB_ENGINE_PROFILE"] = profile
+    return profile
+
+
+def prewarm_pool(app, db, n: int | None = None) -> int:
+    """
+    Abre `n` conexões e as devolve ao pool, para a primeira requisição do
+    worker não pagar o handshake TLS com o pooler.
+    """
+    if app.config.get("DB_ENGINE_PROFILE") != "gunicorn":
+        return 0
+    n = n if n is not None else _env_int("DB_POOL_PREWARM", 2)
+    opened = []
+    with app.app_context():
+        try:
+            for _ in range(n):
+                opened.append(db.engine.connect())
+        except Exception as e:
+            app.logger.warning(f"pré-aquecimento do pool falhou: {e}")
+        finally:
+            for conn in opened:
+                conn.close()
+    return len(opened)
@@ -1,22 +1,37 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
 from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
 # --- Supabase client (para Storage/Auth no backend) ---
-import os
-from supabase import create_client, Client
+# O pacote `supabase` puxa httpx, gotrue, postgrest, realtime...: só é
+# importado no primeiro uso real, via get_supabase(), e não no cold start.
+if TYPE_CHECKING:
+    from supabase import Client
+
+_supabase: "Client | None" = None
+_supabase_lock = threading.Lock()
 
-supabase: Client | None = None
 
-def init_supabase() -> Client | None:
+def get_supabase() -> "Client | None":
     """
-    Inicializa o cliente Supabase usando SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY.
-    (SERVICE_ROLE deve ser usado só no backend.)
+    Cliente Supabase criado sob demanda com SUPABASE_URL e
+    SUPABASE_SERVICE_ROLE_KEY (SERVICE_ROLE deve ser usado só no backend).
+    Retorna None se as envs não estiverem definidas.
     """
-    global supabase
+    global _supabase
+    if _supabase is not None:
+        return _supabase
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    if url and key:
-        supabase = create_client(url, key)
-    else:
-        supabase = None
-    return supabase
+    if not (url and key):
+        return None
+    with _supabase_lock:
+        if _supabase is None:
+            from supabase import create_client
+            _supabase = create_client(url, key)
+    return _supabase
@@ -0,0 +1,102 @@
+"""
+Busca do FAQ (/api/faq/search).
+
+faq_items.search_text guarda pergunta + resposta (sem HTML) já passadas
+por search.fold(): sem acentos e em minúsculas. O admin regrava a coluna
+ao criar/editar uma pergunta.
+
+- PostgreSQL: tsvector com stemming português + inglês + espanhol sobre
+  search_text, com índice GIN na mesma expressão (migração faq_search).
+- Outros bancos (SQLite): índice invertido em memória (search.InvertedIndex),
+  remontado quando o namespace "faq" é invalidado.
+"""
+from __future__ import annotations
+
+import html
+import re
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .cache import VersionedCache
+from .extensions import db
+from .search import InvertedIndex, fold
+
+# perguntas renderizadas na página /faq (o resto vem da busca ou de ?all=1)
+FAQ_PAGE_TOP = 20
+SEARCH_LIMIT = 10
+SEARCH_MAX = 50
+QUESTION_WEIGHT = 3.0
+
+TS_CONFIGS = ("portuguese", "english", "spanish")
+# a expressão precisa ser idêntica à do índice GIN para o planner usá-lo
+FAQ_TSVECTOR = " || ".join(
+    f"to_tsvector('{cfg}', COALESCE(search_text, ''))" for cfg in TS_CONFIGS
+)
+FAQ_TSQUERY = " || ".join(f"plainto_tsquery('{cfg}', :q)" for cfg in TS_CONFIGS)
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def plain_text(answer_html: str) -> str:
+    return html.unescape(_TAG.sub(" ", answer_html or ""))
+
+
+def search_text(question: str, answer: str) -> str:
+    return " ".join(
+        fold(part).replace("-", " ") for part in (question, plain_text(answer)) if part
+    )
+
+
+def use_fulltext() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+# ---------- fallback em memória ----------
+def _load_index() -> dict[str, Any]:
+    rows = db.session.execute(text(
+        "SELECT id, question, answer, position FROM faq_items WHERE active = :on"
+    ), {"on": True}).all()
+    return {
+        "items": {r.id: {"id": r.id, "question": r.question, "answer": r.answer} for r in rows},
+        "index": InvertedIndex(
+            (r.id, r.position, [(r.question, QUESTION_WEIGHT), (plain_text(r.answer), 1.0)])
+            for r in rows
+        ),
+    }
+
+
+faq_index = VersionedCache("faq", _load_index)
+
+
+def _search_memory(q: str, limit: int) -> list[dict[str, Any]]:
+    data = faq_index.get()
+    return [data["items"][i] for i in data["index"].search(q, limit)]
+
+
+def _search_postgres(q: str, limit: int) -> list[dict[str, Any]]:
+    rows = db.session.execute(text(f"""
+        SELECT id, question, answer
+        FROM faq_items
+        WHERE active AND ({FAQ_TSVECTOR}) @@ ({FAQ_TSQUERY})
+        ORDER BY ts_rank({FAQ_TSVECTOR}, {FAQ_TSQUERY}) DESC, position, id
+        LIMIT :n
+    """), {"q": q, "n": limit}).all()
+    return [{"id": r.id, "question": r.question, "answer": r.answer} for r in rows]
+
+
+def search_faq(q: str, limit: int = SEARCH_LIMIT) -> list[dict[str, Any]]:
+    """[{id, question, answer}] das perguntas ativas que casam com `q`."""
+    q = fold(q).replace("-", " ")
+    if not q:
+        return []
+    if use_fulltext():
+        try:
+            return _search_postgres(q, limit)
+        except SQLAlchemyError as e:
+            # coluna ainda não migrada: busca em memória até rodar o init_db
+            db.session.rollback()
+            current_app.logger.warning(f"busca full-text do FAQ indisponível: {e}")
+    return _search_memory(q, limit)
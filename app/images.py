@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+
+# Pillow é opcional (sem ele servimos apenas o original, sem resize/conversão)
+# e só é importado quando a primeira variante precisa ser gerada.
+_pil = None
+
+
+def _load_pil():
+    global _pil
+    if _pil is None:
+        try:
+            from PIL import Image, ImageOps, features
+            _pil = (Image, ImageOps, features)
+        except ImportError:  # pragma: no cover - depende do ambiente
+            _pil = (None, None, None)
+    return _pil
+
+
+# Larguras permitidas: limita o número de variantes por imagem
+IMAGE_WIDTHS = (320, 480, 640, 960, 1280, 1920)
+
+MIME_BY_FORMAT = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "avif": "image/avif",
+}
+
+FORMAT_BY_MIME = {mime: fmt for fmt, mime in MIME_BY_FORMAT.items()}
+
+# parâmetros de encode por formato
+_SAVE_OPTS = {
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60},
+    "png": {"optimize": True},
+}
+
+
+# ---------- identificação ----------
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sniff_format(data: bytes) -> str | None:
+    """
+    Identifica o formato pelos magic bytes (não confia na extensão).
+    """
+    head = data[:16]
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "avif"
+    return None
+
+
+def sniff_mime(data: bytes) -> str:
+    return MIME_BY_FORMAT.get(sniff_format(data) or "", "application/octet-stream")
+
+
+# ---------- negociação ----------
+def can_encode(fmt: str) -> bool:
+    Image, _, features = _load_pil()
+    if Image is None:
+        return False
+    if fmt in ("jpeg", "png"):
+        return True
+    try:
+        return bool(features.check(fmt))
+    except Exception:
+        return False
+
+
+def snap_width(w: int | None) -> int | None:
+    """
+    Arredonda a largura pedida para a menor largura permitida >= w.
+    """
+    if not w or w <= 0:
+        return None
+    for allowed in IMAGE_WIDTHS:
+        if w <= allowed:
+            return allowed
+    return IMAGE_WIDTHS[-1]
+
+
+def negotiate_format(requested: str | None, accept: str, original: str) -> tuple[str, bool]:
+    """
+    Retorna (formato, variou_por_accept).
+    `requested` vem de ?fmt=; sem ele, escolhe pelo header Accept.
+    """
+    requested = (requested or "").lower().strip()
+    if requested == "jpg":
+        requested = "jpeg"
+    if requested == "orig":
+        return original, False
+    if requested in MIME_BY_FORMAT:
+        return (requested if can_encode(requested) else original), False
+
+    # GIF pode ser animado: não convertemos
+    if original == "gif":
+        return original, False
+    accept = accept or ""
+    if "image/avif" in accept and can_encode("avif"):
+        return "avif", True
+    if "image/webp" in accept and can_encode("webp"):
+        return "webp", True
+    return original, True
+
+
+def variant_etag(image_hash: str, width: int | None, fmt: str) -> str:
+    return f"{image_hash[:32]}-{width or 0}-{fmt}"
+
+
+# ---------- cache em disco ----------
+def variant_path(root: str, image_hash: str, width: int | None, fmt: str) -> str:
+    return os.path.join(root, image_hash[:2], image_hash, f"{width or 'orig'}.{fmt}")
+
+
+def read_variant(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_variant(path: str, data: bytes) -> None:
+    """
+    Grava de forma atômica (tmp + rename) para não servir arquivo parcial
+    quando dois workers geram a mesma variante ao mesmo tempo.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        # disco cheio / somente leitura: segue servindo sem cache
+        pass
+
+
+# ---------- transformação ----------
+def _fit(size: tuple[int, int], max_side: int) -> tuple[int, int]:
+    w, h = size
+    if max(w, h) <= max_side:
+        return w, h
+    scale = max_side / max(w, h)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def _encode_gif(im, size: tuple[int, int]) -> bytes:
+    """
+    Re-encoda um GIF (todos os quadros, com duração e loop) no tamanho
+    `size`. Os quadros são decodificados um a um; só os redimensionados
+    ficam na memória.
+    """
+    Image, _, _ = _load_pil()
+    from PIL import ImageSequence
+
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(im):
+        f = frame.convert("RGBA")
+        if f.size != size:
+            f = f.resize(size, Image.LANCZOS)
+        frames.append(f)
+        durations.append(frame.info.get("duration", im.info.get("duration", 100)))
+    opts = {"save_all": True, "append_images": frames[1:], "duration": durations,
+            "disposal": 2, "optimize": True}
+    if "loop" in im.info:
+        opts["loop"] = im.info["loop"]
+    out = io.BytesIO()
+    frames[0].save(out, format="GIF", **opts)
+    return out.getvalue()
+
+
+def render_variant(data: bytes, width: int | None, fmt: str, original: str) -> bytes:
+    """
+    Gera a variante (resize + conversão). Sem Pillow, devolve o original.
+    """
+    if width is None and fmt == original:
+        return data
+    Image, ImageOps, _ = _load_pil()
+    if Image is None:
+        return data
+
+    with Image.open(io.BytesIO(data)) as im:
+        if fmt == "gif" and original == "gif":
+            # mantém a animação: todos os quadros redimensionados
+            return _encode_gif(im, _fit(im.size, width or max(im.size)))
+        im = ImageOps.exif_transpose(im)
+        if width and im.width > width:
+            height = max(1, round(im.height * width / im.width))
+            im = im.resize((width, height), Image.LANCZOS)
+        if fmt == "jpeg" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        elif fmt in ("webp", "avif") and im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.mode in ("P", "LA", "PA") else "RGB")
+        out = io.BytesIO()
+        im.save(out, format=fmt.upper(), **_SAVE_OPTS.get(fmt, {}))
+        return out.getvalue()
+
+
+def normalize_image(fp, fmt: str, max_side: int, max_pixels: int) -> bytes:
+    """
+    Normaliza um upload: orientação aplicada, EXIF/metadados descartados,
+    maior lado <= max_side e re-encode no formato original. Lê de `fp`
+    (arquivo temporário) sem trazer o original para a memória; JPEG já é
+    decodificado reduzido (draft). GIF mantém a animação: todos os quadros
+    reduzidos, e o total de pixels dos quadros também fica <= max_pixels.
+    Sem Pillow devolve o arquivo como veio. ValueError se não for imagem válida.
+    """
+    Image, ImageOps, _ = _load_pil()
+    if Image is None:
+        return fp.read()
+    try:
+        with Image.open(fp) as im:
+            if im.width * im.height > max_pixels:
+                raise ValueError(f"imagem grande demais ({im.width}x{im.height})")
+            if fmt == "gif":
+                size = _fit(im.size, max_side)
+                frames = getattr(im, "n_frames", 1)
+                if frames * size[0] * size[1] > max_pixels:
+                    raise ValueError(f"animação grande demais ({frames} quadros de {im.width}x{im.height})")
+                return _encode_gif(im, size)
+            icc = im.info.get("icc_profile")  # perfil de cor não é metadado pessoal: mantém
+            if fmt == "jpeg":
+                im.draft("RGB", (max_side, max_side))
+            im = ImageOps.exif_transpose(im)
+            if max(im.size) > max_side:
+                im.thumbnail((max_side, max_side), Image.LANCZOS)
+            if fmt == "jpeg" and im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            out = io.BytesIO()
+            opts = dict(_SAVE_OPTS.get(fmt, {}))
+            if icc:
+                opts["icc_profile"] = icc
+            im.save(out, format=fmt.upper(), **opts)
+            return out.getvalue()
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"imagem inválida: {e}") from e
@@ -0,0 +1,600 @@
+"""
+Ingestão dos formulários públicos (/api/quote e /api/contact).
+
+INGEST_MODE:
+- sync (padrão): INSERT + COMMIT na própria requisição, como sempre foi.
+- queue: a requisição valida, grava a linha numa fila local durável
+  (SQLite em modo WAL, INGEST_QUEUE_PATH) e responde 202 na hora. Uma
+  thread por processo descarrega a fila no banco em lotes.
+
+Entrega "pelo menos uma vez": a linha só sai da fila local depois do COMMIT
+no banco. Cada lead tem um ingest_key (único no banco) e o INSERT usa
+ON CONFLICT DO NOTHING, então reenvios após falha não duplicam linhas.
+Se o banco estiver fora, os lotes voltam para a fila com backoff
+exponencial; linhas rejeitadas pelo banco (erro de dados) vão para a
+tabela local `dead` depois de INGEST_MAX_ATTEMPTS tentativas.
+
+Só faz sentido com processos de vida longa (gunicorn). No perfil
+serverless a fila em /tmp não sobrevive à instância, então o modo cai
+para sync.
+
+Deduplicação: o cliente pode mandar Idempotency-Key (vira o ingest_key) e
+as cotações têm uma impressão digital (telefone, datas, categoria).
+Repetições dentro de DEDUP_WINDOW devolvem a resposta original sem nova
+escrita: primeiro num mapa em memória (por processo), depois no banco. No
+modo queue a requisição não consulta o banco: a repetição que cai em outro
+worker antes da descarga é enfileirada e descartada pelo flusher (mesmo
+ingest_key via ON CONFLICT; mesma impressão digital dentro da janela, por
+_drop_fingerprint_dups). Dois lotes com a mesma cotação descarregados no
+mesmo instante por processos diferentes ainda podem gravar as duas linhas.
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import Date, DateTime, insert, or_, select
+from sqlalchemy.exc import (
+    DBAPIError,
+    DisconnectionError,
+    IntegrityError,
+    SQLAlchemyError,
+    TimeoutError as PoolTimeoutError,
+)
+
+from .extensions import db
+from .models import ContactMessage, QuoteRequest, parse_form_date
+
+MODELS = {"quote": QuoteRequest, "contact": ContactMessage}
+
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0       # segundos entre varreduras com a fila vazia
+LEASE_SECONDS = 60         # linha "reservada" por um processo
+MAX_BACKOFF = 60.0
+MAX_ATTEMPTS = 5
+DEDUP_WINDOW = 600         # segundos em que uma repetição é considerada duplicata
+FINGERPRINT_MIN_DIGITS = 8  # telefone com menos dígitos não entra na impressão digital
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def ingest_mode(app) -> str:
+    mode = (app.config.get("INGEST_MODE") or "sync").lower()
+    if mode == "queue" and app.config.get("DB_ENGINE_PROFILE") == "serverless":
+        return "sync"
+    return "queue" if mode == "queue" else "sync"
+
+
+def new_ingest_key() -> str:
+    return uuid.uuid4().hex
+
+
+def client_ingest_key(header: str | None) -> str | None:
+    """Idempotency-Key do cliente -> ingest_key (32 hex, cabe na coluna)."""
+    header = (header or "").strip()
+    if not header or len(header) > 200:
+        return None
+    return hashlib.sha256(header.encode()).hexdigest()[:32]
+
+
+def _fingerprint_date(value: str | None) -> str:
+    """'01/12/2025' e '2025-12-01' dão o mesmo texto; o que não for data vai como veio."""
+    parsed = parse_form_date(value)
+    return parsed.isoformat() if parsed else (value or "").strip()
+
+
+def quote_fingerprint(fields: dict[str, Any]) -> str | None:
+    """
+    Impressão digital da cotação, ou None quando o telefone não identifica
+    ninguém ("N/A", "whatsapp"): sem ele, clientes diferentes com as mesmas
+    datas colidiriam; só a Idempotency-Key deduplica nesse caso.
+    """
+    phone = re.sub(r"\D+", "", fields.get("phone") or "")
+    if len(phone) < FINGERPRINT_MIN_DIGITS:
+        return None
+    parts = (
+        phone,
+        _fingerprint_date(fields.get("pickup_date")),
+        _fingerprint_date(fields.get("drop_date")),
+        (fields.get("category") or "").strip().casefold(),
+    )
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+class RecentLeads:
+    """
+    Mapa em memória (por processo) chave -> resposta, com expiração.
+    Atende cliques duplos sem ir ao banco.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._data[key]
+                return None
+            return item[1]
+
+    def put(self, key: str, result: dict[str, Any]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._data = {k: v for k, v in self._data.items() if v[0] >= now}
+                while len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (now + self.ttl, result)
+
+
+recent_leads = RecentLeads(_env_float("DEDUP_WINDOW", DEDUP_WINDOW))
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} não serializável")
+
+
+# ---------- fila local ----------
+class LocalQueue:
+    """
+    Fila em SQLite (WAL + synchronous=FULL): o enqueue é um INSERT local
+    com fsync, sem ida à rede. Compartilhada pelos workers do mesmo host;
+    cada lote é reservado (lease) por quem vai descarregá-lo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # conexão por processo (não atravessa o fork do gunicorn)
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " kind TEXT NOT NULL,"
+                " ingest_key TEXT NOT NULL UNIQUE,"
+                " payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " enqueued_at REAL NOT NULL,"
+                " lease_until REAL NOT NULL DEFAULT 0,"
+                " last_error TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead ("
+                " seq INTEGER PRIMARY KEY, kind TEXT, ingest_key TEXT,"
+                " payload TEXT, attempts INTEGER, enqueued_at REAL, last_error TEXT)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def put(self, kind: str, ingest_key: str, payload: dict[str, Any]) -> None:
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR IGNORE INTO pending (kind, ingest_key, payload, enqueued_at) "
+                "VALUES (?, ?, ?, ?)",
+                (kind, ingest_key, json.dumps(payload, default=_json_default), time.time()),
+            )
+
+    def claim(self, limit: int) -> list[tuple[int, str, str, dict[str, Any], int]]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT seq, kind, ingest_key, payload, attempts FROM pending "
+                    "WHERE lease_until < ? ORDER BY seq LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                if rows:
+                    conn.executemany(
+                        "UPDATE pending SET lease_until = ? WHERE seq = ?",
+                        [(now + LEASE_SECONDS, r[0]) for r in rows],
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [(seq, kind, key, json.loads(p), att) for seq, kind, key, p, att in rows]
+
+    def ack(self, seqs: list[int]) -> None:
+        if not seqs:
+            return
+        with self._lock:
+            self._connect().executemany("DELETE FROM pending WHERE seq = ?", [(s,) for s in seqs])
+
+    def release(self, seqs: list[int], error: str, delay: float) -> None:
+        """Devolve linhas à fila (visíveis de novo após `delay`)."""
+        with self._lock:
+            self._connect().executemany(
+                "UPDATE pending SET attempts = attempts + 1, lease_until = ?, last_error = ? "
+                "WHERE seq = ?",
+                [(time.time() + delay, error[:500], s) for s in seqs],
+            )
+
+    def bury(self, seq: int, error: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO dead "
+                "SELECT seq, kind, ingest_key, payload, attempts + 1, enqueued_at, ? "
+                "FROM pending WHERE seq = ?",
+                (error[:500], seq),
+            )
+            conn.execute("DELETE FROM pending WHERE seq = ?", (seq,))
+            conn.execute("COMMIT")
+
+    def depth(self) -> dict[str, int]:
+        with self._lock:
+            conn = self._connect()
+            pending = conn.execute("SELECT count(*) FROM pending").fetchone()[0]
+            dead = conn.execute("SELECT count(*) FROM dead").fetchone()[0]
+        return {"pending": pending, "dead": dead}
+
+
+# ---------- descarga ----------
+def _row(model, ingest_key: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """Payload JSON da fila -> valores de coluna (datas voltam a ser date/datetime)."""
+    row = dict(payload, ingest_key=ingest_key)
+    for col in model.__table__.columns:
+        value = row.get(col.name)
+        if isinstance(value, str) and isinstance(col.type, (Date, DateTime)):
+            parsed = datetime.fromisoformat(value)
+            row[col.name] = parsed if isinstance(col.type, DateTime) else parsed.date()
+    return row
+
+
+def _uniform_rows(model, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Mesmo conjunto de colunas em todas as linhas: o executemany tira a lista
+    de colunas da primeira linha, então uma chave ausente noutra linha
+    quebraria o lote (ou seria gravada como NULL em silêncio).
+    """
+    names = set().union(*rows)
+    table = model.__table__
+    fill: dict[str, Any] = {}
+    for name in names:
+        col = table.c.get(name)
+        default = col.default if col is not None else None
+        if default is None or not (default.is_scalar or default.is_callable):
+            fill[name] = None
+        else:
+            fill[name] = default.arg if default.is_scalar else default.arg(None)
+    return [dict(fill, **r) if len(r) < len(names) else r for r in rows]
+
+
+def _insert_ignore(model, rows: list[dict[str, Any]]) -> None:
+    """INSERT em lote ignorando ingest_keys já gravados."""
+    dialect = db.engine.dialect.name
+    table = model.__table__
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).on_conflict_do_nothing(index_elements=["ingest_key"])
+        db.session.execute(stmt, rows)
+        return
+
+    keys = [r["ingest_key"] for r in rows]
+    seen = set(db.session.execute(
+        select(table.c.ingest_key).where(table.c.ingest_key.in_(keys))
+    ).scalars())
+    rows = [r for r in rows if r["ingest_key"] not in seen]
+    if rows:
+        db.session.execute(insert(table), rows)
+
+
+def _drop_fingerprint_dups(model, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Remove cotações cuja impressão digital já foi gravada (ou aparece antes
+    no lote) dentro de DEDUP_WINDOW: repetições que chegaram a outro worker
+    antes de a primeira sair da fila.
+    """
+    if "fingerprint" not in model.__table__.c:
+        return rows
+    fps = {r["fingerprint"] for r in rows if r.get("fingerprint")}
+    if not fps:
+        return rows
+    window = timedelta(seconds=recent_leads.ttl)
+    table = model.__table__
+    oldest = min(r["created_at"] for r in rows if r.get("fingerprint")) - window
+    seen: dict[str, list[datetime]] = {}
+    for fp, created in db.session.execute(
+        select(table.c.fingerprint, table.c.created_at)
+        .where(table.c.fingerprint.in_(fps), table.c.created_at >= oldest)
+    ):
+        seen.setdefault(fp, []).append(created)
+
+    kept = []
+    for r in sorted(rows, key=lambda r: r["created_at"]):
+        fp = r.get("fingerprint")
+        if fp:
+            if any(abs(r["created_at"] - t) <= window for t in seen.get(fp, ())):
+                continue
+            seen.setdefault(fp, []).append(r["created_at"])
+        kept.append(r)
+    return kept
+
+
+class Flusher:
+    def __init__(self, app, queue: LocalQueue):
+        self.app = app
+        self.queue = queue
+        self.batch_size = int(_env_float("INGEST_BATCH_SIZE", BATCH_SIZE))
+        self.interval = _env_float("INGEST_FLUSH_INTERVAL", FLUSH_INTERVAL)
+        self.max_attempts = int(_env_float("INGEST_MAX_ATTEMPTS", MAX_ATTEMPTS))
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+        self._backoff = 0.0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.buried = 0
+        self.last_error: str | None = None
+
+    def ensure_started(self) -> None:
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="ingest-flusher", daemon=True)
+                self._thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._backoff or self.interval)
+            self._wake.clear()
+            try:
+                while self.flush_once():
+                    pass
+            except Exception as e:  # a thread nunca morre
+                self.app.logger.warning(f"ingest: falha inesperada na descarga: {e}")
+
+    def flush_once(self) -> int:
+        """Descarrega um lote. Retorna quantas linhas saíram da fila."""
+        batch = self.queue.claim(self.batch_size)
+        if not batch:
+            return 0
+        with self.app.app_context():
+            try:
+                self._write(batch)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                if _is_transient(e):
+                    return self._retry_later(batch, e)
+                # erro de dados/statement em alguma linha: isola linha a linha
+                return self._write_one_by_one(batch)
+            except Exception:
+                # payload que nem vira linha (data inválida, kind desconhecido)
+                db.session.rollback()
+                return self._write_one_by_one(batch)
+            finally:
+                db.session.remove()
+        self.queue.ack([b[0] for b in batch])
+        self._backoff = 0.0
+        self.flushed += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _write(self, batch) -> None:
+        by_kind: dict[str, list[dict[str, Any]]] = {}
+        for _, kind, key, payload, _ in batch:
+            by_kind.setdefault(kind, []).append(_row(MODELS[kind], key, payload))
+        for kind, rows in by_kind.items():
+            rows = _drop_fingerprint_dups(MODELS[kind], rows)
+            if rows:
+                _insert_ignore(MODELS[kind], _uniform_rows(MODELS[kind], rows))
+        db.session.commit()
+
+    def _write_one_by_one(self, batch) -> int:
+        done = 0
+        for item in batch:
+            seq, attempts, error = item[0], item[4], None
+            poison = False
+            try:
+                self._write([item])
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                error = str(e)
+                if _is_transient(e):
+                    self._retry_later([item], e)
+                    continue
+            except Exception as e:
+                # falha fora do banco (conversão do payload): repetir não adianta
+                db.session.rollback()
+                error, poison = f"{type(e).__name__}: {e}", True
+            if error is None:
+                self.queue.ack([seq])
+                self.flushed += 1
+                done += 1
+            elif poison or attempts + 1 >= self.max_attempts:
+                self.queue.bury(seq, error)
+                self.buried += 1
+                self.app.logger.error(f"ingest: linha {seq} descartada para 'dead': {error}")
+            else:
+                self.queue.release([seq], error, delay=self._next_backoff())
+        return done
+
+    def _next_backoff(self) -> float:
+        self._backoff = min(MAX_BACKOFF, (self._backoff or self.interval) * 2)
+        return self._backoff
+
+    def _retry_later(self, batch, error: Exception) -> int:
+        self.failures += 1
+        self.last_error = str(error)[:500]
+        delay = self._next_backoff()
+        self.queue.release([b[0] for b in batch], self.last_error, delay=delay)
+        self.app.logger.warning(
+            f"ingest: banco indisponível, {len(batch)} linha(s) de volta à fila (retry em {delay:.0f}s)"
+        )
+        return 0
+
+    def drain(self, timeout: float = 10.0) -> int:
+        """Descarrega o que der até `timeout` (saída do worker / script)."""
+        deadline = time.monotonic() + timeout
+        total = 0
+        while time.monotonic() < deadline:
+            n = self.flush_once()
+            if not n:
+                break
+            total += n
+        return total
+
+    def stats(self) -> dict[str, Any]:
+        return dict(
+            self.queue.depth(),
+            flushed=self.flushed,
+            batches=self.batches,
+            failures=self.failures,
+            buried=self.buried,
+            backoff_s=self._backoff,
+            last_error=self.last_error,
+        )
+
+
+def _is_transient(e: SQLAlchemyError) -> bool:
+    """
+    Conexão/servidor (vale tentar o lote de novo mais tarde), não os dados.
+    Todo o resto — InvalidRequestError, StatementError, IntegrityError... —
+    vai para o isolamento linha a linha e, persistindo, para 'dead'.
+    """
+    if isinstance(e, (PoolTimeoutError, DisconnectionError)):
+        return True
+    if not isinstance(e, DBAPIError):
+        return False
+    if e.connection_invalidated:
+        return True
+    # OperationalError/InterfaceError do driver
+    name = type(e.orig).__name__ if e.orig is not None else ""
+    return name in ("OperationalError", "InterfaceError")
+
+
+# ---------- API ----------
+def init_ingest(app) -> None:
+    app.extensions["ingest"] = None
+    if ingest_mode(app) != "queue":
+        return
+    path = app.config.get("INGEST_QUEUE_PATH") or os.path.join(
+        os.environ.get("TMPDIR") or "/tmp", "mdy_ingest.sqlite3"
+    )
+    flusher = Flusher(app, LocalQueue(path))
+    app.extensions["ingest"] = flusher
+    atexit.register(lambda: flusher.drain(timeout=5.0))
+
+
+def get_flusher() -> Flusher | None:
+    return current_app.extensions.get("ingest")
+
+
+def _find_existing(model, ingest_key: str | None, fingerprint: str | None) -> int | None:
+    conds = []
+    if ingest_key:
+        conds.append(model.ingest_key == ingest_key)
+    if fingerprint and hasattr(model, "fingerprint"):
+        cutoff = datetime.utcnow() - timedelta(seconds=recent_leads.ttl)
+        conds.append((model.fingerprint == fingerprint) & (model.created_at >= cutoff))
+    if not conds:
+        return None
+    return db.session.execute(
+        select(model.id).where(or_(*conds)).order_by(model.id.desc()).limit(1)
+    ).scalar()
+
+
+def submit(
+    kind: str,
+    fields: dict[str, Any],
+    idempotency_key: str | None = None,
+    fingerprint: str | None = None,
+) -> dict[str, Any]:
+    """
+    Grava um lead (quote/contact). Retorna o corpo JSON da resposta:
+    {"ok", "id"} no modo sync; {"ok", "queued", "key"} no modo queue;
+    repetições devolvem a resposta original com "duplicate": true.
+    """
+    model = MODELS[kind]
+    client_key = client_ingest_key(idempotency_key)
+    key = client_key or new_ingest_key()
+    if "fingerprint" in model.__table__.c:
+        # sempre presente (None incluso): o lote da fila tem colunas uniformes
+        fields = dict(fields, fingerprint=fingerprint)
+    dedup = [f"{kind}:k:{client_key}"] if client_key else []
+    if fingerprint:
+        dedup.append(f"{kind}:f:{fingerprint}")
+
+    for d in dedup:
+        hit = recent_leads.get(d)
+        if hit is not None:
+            return dict(hit, duplicate=True)
+
+    flusher = get_flusher()
+    if flusher is None:
+        existing = _find_existing(model, client_key, fingerprint) if dedup else None
+        if existing is not None:
+            result = {"ok": True, "id": existing}
+            for d in dedup:
+                recent_leads.put(d, result)
+            return dict(result, duplicate=True)
+        obj = model(ingest_key=key, **fields)
+        db.session.add(obj)
+        try:
+            db.session.commit()
+            result = {"ok": True, "id": obj.id}
+        except IntegrityError:
+            # mesma Idempotency-Key gravada em paralelo por outra requisição
+            db.session.rollback()
+            existing = _find_existing(model, client_key, None) if client_key else None
+            if existing is None:
+                raise
+            result = {"ok": True, "id": existing}
+    else:
+        payload = dict(fields, created_at=datetime.utcnow().isoformat())
+        flusher.queue.put(kind, key, payload)
+        flusher.ensure_started()
+        flusher.notify()
+        result = {"ok": True, "queued": True, "key": key}
+
+    for d in dedup:
+        recent_leads.put(d, result)
+    return result
@@ -0,0 +1,299 @@
+"""
+Métricas por requisição (por processo).
+
+Para cada endpoint: histograma de latência, contagem por status, número
+de queries SQL e tempo total no banco (eventos before/after_cursor_execute
+da Engine), tempo de renderização de templates (sinais do Flask) e bytes
+da resposta (já comprimida). /admin/metrics expõe tudo no formato texto
+do Prometheus, junto com as métricas do pool (db_engine.pool_stats).
+
+Queries acima de SLOW_QUERY_MS vão para o logger "app.slow_query" com o
+statement e o endpoint que a emitiu; as últimas ficam em recent_slow().
+
+Cada worker do gunicorn tem o próprio registro: o scrape mostra o worker
+que atendeu. METRICS_ENABLED=0 desliga a coleta; METRICS_SERVER_TIMING=1
+adiciona o cabeçalho Server-Timing (db/tpl/app) às respostas.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .db_engine import WAIT_BUCKETS, pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SLOW_QUERY_MS = 200.0
+SLOW_LOG_SIZE = 50
+STATEMENT_MAX = 1000
+
+slow_log = logging.getLogger("app.slow_query")
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+
+class _Endpoint:
+    __slots__ = ("latency", "queries", "statuses", "sql_seconds", "template_seconds", "bytes")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.statuses: dict[tuple[str, int], int] = {}
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.bytes = 0
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.endpoints: dict[str, _Endpoint] = {}
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def record(self, endpoint: str, method: str, status: int, state: dict, nbytes: int) -> None:
+        with self._lock:
+            ep = self.endpoints.get(endpoint)
+            if ep is None:
+                ep = self.endpoints[endpoint] = _Endpoint()
+            ep.latency.observe(time.perf_counter() - state["start"])
+            ep.queries.observe(state["queries"])
+            key = (method, status)
+            ep.statuses[key] = ep.statuses.get(key, 0) + 1
+            ep.sql_seconds += state["sql"]
+            ep.template_seconds += state["template"]
+            ep.bytes += nbytes
+
+    def record_slow(self, entry: dict) -> None:
+        with self._lock:
+            self.slow.append(entry)
+
+    def recent_slow(self) -> list[dict]:
+        with self._lock:
+            return list(self.slow)
+
+    # ---------- exposição ----------
+    def prometheus(self) -> str:
+        out: list[str] = []
+
+        def header(name, kind, help_text):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, label, hist):
+            acc = 0
+            for bound, n in zip([*map(str, hist.bounds), "+Inf"], hist.counts):
+                acc += n
+                out.append(f'{name}_bucket{{{label},le="{bound}"}} {acc}')
+            out.append(f"{name}_sum{{{label}}} {hist.total:.6f}")
+            out.append(f"{name}_count{{{label}}} {acc}")
+
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            header("http_request_duration_seconds", "histogram", "Latência por endpoint.")
+            for name, ep in items:
+                histogram("http_request_duration_seconds", _label(endpoint=name), ep.latency)
+            header("http_requests_total", "counter", "Requisições por endpoint, método e status.")
+            for name, ep in items:
+                for (method, status), n in sorted(ep.statuses.items()):
+                    out.append(f"http_requests_total{{{_label(endpoint=name, method=method, status=status)}}} {n}")
+            header("http_request_db_queries", "histogram", "Queries SQL por requisição.")
+            for name, ep in items:
+                histogram("http_request_db_queries", _label(endpoint=name), ep.queries)
+            for metric, attr, help_text in (
+                ("http_request_db_seconds_total", "sql_seconds", "Tempo no banco (cursor.execute)."),
+                ("http_request_template_seconds_total", "template_seconds", "Tempo renderizando templates."),
+                ("http_response_bytes_total", "bytes", "Bytes enviados no corpo (após compressão)."),
+            ):
+                header(metric, "counter", help_text)
+                for name, ep in items:
+                    value = getattr(ep, attr)
+                    value = f"{value:.6f}" if isinstance(value, float) else value
+                    out.append(f"{metric}{{{_label(endpoint=name)}}} {value}")
+
+        pool = pool_stats.snapshot()
+        for key in ("connects", "closes", "invalidations", "checkouts", "checkins"):
+            header(f"db_pool_{key}_total", "counter", f"Pool: {key}.")
+            out.append(f"db_pool_{key}_total {pool[key]}")
+        wait = pool["checkout_wait"]
+        header("db_pool_checkout_wait_seconds", "histogram", "Espera por uma conexão do pool.")
+        acc = 0
+        for bound, n in zip([*map(str, WAIT_BUCKETS), "+Inf"], wait["buckets"].values()):
+            acc += n
+            out.append(f'db_pool_checkout_wait_seconds_bucket{{le="{bound}"}} {acc}')
+        out.append(f"db_pool_checkout_wait_seconds_sum {wait['total_s']}")
+        out.append(f"db_pool_checkout_wait_seconds_count {acc}")
+        return "\n".join(out) + "\n"
+
+
+def _label(**labels) -> str:
+    def esc(v) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{k}="{esc(v)}"' for k, v in labels.items())
+
+
+request_metrics = RequestMetrics()
+
+
+def current_state() -> dict | None:
+    """Contadores da requisição atual (None fora de requisição ou sem métricas)."""
+    if not has_request_context():
+        return None
+    return g.get("_metrics")
+
+
+# ---------- SQL ----------
+# no nível da classe Engine: vale para a engine criada depois (como em db_engine)
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["_query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    state = current_state()
+    if state is not None:
+        state["queries"] += 1
+        state["sql"] += elapsed
+        for hook in _statement_hooks:
+            hook(state, statement, elapsed)
+    if _slow_ms is not None and elapsed * 1000 >= _slow_ms:
+        endpoint = request.endpoint if has_request_context() else None
+        entry = {
+            "ms": round(elapsed * 1000, 1),
+            "endpoint": endpoint or "-",
+            "path": request.path if has_request_context() else None,
+            "statement": " ".join(statement.split())[:STATEMENT_MAX],
+            "at": time.time(),
+        }
+        request_metrics.record_slow(entry)
+        slow_log.warning(f"[slow-query] {entry['ms']} ms em {entry['endpoint']}: {entry['statement']}")
+
+
+_slow_ms: float | None = None  # definido por init_metrics (None = sem log de lentas)
+# chamados a cada statement dentro de uma requisição: hook(state, statement, elapsed)
+_statement_hooks: list = []
+
+
+def add_statement_hook(hook) -> None:
+    if hook not in _statement_hooks:
+        _statement_hooks.append(hook)
+
+
+# ---------- templates ----------
+def _before_render(sender, template, context, **extra):
+    state = current_state()
+    if state is not None:
+        state["_tpl"].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    state = current_state()
+    if state is not None and state["_tpl"]:
+        elapsed = time.perf_counter() - state["_tpl"].pop()
+        # include/extends não disparam o sinal; só render_template aninhado
+        if not state["_tpl"]:
+            state["template"] += elapsed
+
+
+# ---------- ciclo da requisição ----------
+def _start():
+    g._metrics = {"start": time.perf_counter(), "queries": 0, "sql": 0.0, "template": 0.0, "_tpl": []}
+
+
+def _counted(iterable, counter: list):
+    for chunk in iterable:
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def _finish(response):
+    state = current_state()
+    if state is None or state.get("done"):
+        return response
+    state["done"] = True
+    endpoint = request.endpoint or "unmatched"
+    method, status = request.method, response.status_code
+
+    if response.is_streamed:
+        # streaming (exportações): conta os bytes e fecha a medição no fim
+        counter = [0]
+        response.response = _counted(response.response, counter)
+        response.call_on_close(
+            lambda: request_metrics.record(endpoint, method, status, state, counter[0])
+        )
+    else:
+        nbytes = response.calculate_content_length() or 0
+        request_metrics.record(endpoint, method, status, state, nbytes)
+        if _server_timing:
+            app_ms = (time.perf_counter() - state["start"]) * 1000
+            response.headers["Server-Timing"] = (
+                f'db;dur={state["sql"] * 1000:.1f};desc="{state["queries"]} queries", '
+                f'tpl;dur={state["template"] * 1000:.1f}, app;dur={app_ms:.1f}'
+            )
+    # por último: um hook pode levantar (query_budget em modo strict)
+    for hook in _finish_hooks:
+        hook(state, endpoint, response)
+    return response
+
+
+def _teardown(exc):
+    # exceção não tratada: after_request não roda
+    state = g.pop("_metrics", None)
+    if state is not None and not state.get("done"):
+        request_metrics.record(request.endpoint or "unmatched", request.method, 500, state, 0)
+
+
+# chamados ao fim de cada requisição: hook(state, endpoint, response)
+_finish_hooks: list = []
+_server_timing = False
+
+
+def add_finish_hook(hook) -> None:
+    if hook not in _finish_hooks:
+        _finish_hooks.append(hook)
+
+
+def init_metrics(app) -> None:
+    """
+    Registrar ANTES de init_compression: o after_request daqui roda depois
+    (ordem inversa) e mede o corpo já comprimido.
+    """
+    global _slow_ms, _server_timing
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    _slow_ms = float(app.config.get("SLOW_QUERY_MS", SLOW_QUERY_MS))
+    _server_timing = bool(app.config.get("METRICS_SERVER_TIMING"))
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_teardown)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
@@ -0,0 +1,287 @@
+"""
+Gerenciamento de schema (fora do boot da aplicação).
+
+upgrade() cria as tabelas que faltam (db.create_all), aplica os ajustes que
+o create_all não faz (colunas novas em tabelas existentes, índices,
+backfills) e grava SCHEMA_VERSION em schema_migrations. Todos os passos são
+idempotentes. Executado por scripts/init_db.py; no boot só existe a
+checagem opcional (e barata) de versão.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .extensions import db
+
+
+def _columns(table: str) -> set[str]:
+    return {c["name"] for c in inspect(db.engine).get_columns(table)}
+
+
+def _add_column(table: str, column: str, ddl_type: str) -> bool:
+    if column in _columns(table):
+        return False
+    db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+    db.session.commit()
+    return True
+
+
+def _create_index(name: str, table: str, columns: str, unique: bool = False) -> None:
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    db.session.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})"))
+    db.session.commit()
+
+
+# ---------- passos ----------
+def category_image_metadata(log=print) -> None:
+    """
+    Colunas image_hash/image_mime + backfill das imagens já gravadas.
+    """
+    from .images import content_hash, sniff_mime
+
+    _add_column("featured_categories", "image_hash", "VARCHAR(64)")
+    _add_column("featured_categories", "image_mime", "VARCHAR(40)")
+    _create_index("ix_featured_categories_image_hash", "featured_categories", "image_hash")
+
+    # uma linha por vez: evita trazer todos os blobs de uma só vez
+    ids = db.session.execute(text(
+        "SELECT id FROM featured_categories WHERE image IS NOT NULL AND image_hash IS NULL"
+    )).scalars().all()
+    for cid in ids:
+        data = db.session.execute(
+            text("SELECT image FROM featured_categories WHERE id = :id"), {"id": cid}
+        ).scalar()
+        if not data:
+            continue
+        data = bytes(data)
+        db.session.execute(
+            text("UPDATE featured_categories SET image_hash = :h, image_mime = :m WHERE id = :id"),
+            {"h": content_hash(data), "m": sniff_mime(data), "id": cid},
+        )
+        db.session.commit()
+    if ids:
+        log(f"[migrations] image_hash preenchido para {len(ids)} categoria(s)")
+
+
+def category_image_size(log=print) -> None:
+    """
+    Coluna image_size (tamanho calculado no banco, sem trafegar o blob).
+    """
+    if _add_column("featured_categories", "image_size", "INTEGER"):
+        db.session.execute(text(
+            "UPDATE featured_categories SET image_size = length(image) "
+            "WHERE image IS NOT NULL AND image_size IS NULL"
+        ))
+        db.session.commit()
+
+
+def seed_legal_pages(log=print) -> None:
+    """
+    Cria as páginas legais que faltam e sanitiza o HTML já gravado, para
+    que GET /privacy e /terms nunca precisem escrever no banco.
+    """
+    from .models import LEGAL_PAGES, LegalPage
+    from .sanitize import sanitize_html
+
+    for key, title in LEGAL_PAGES.items():
+        page = LegalPage.query.filter_by(key=key).first()
+        if not page:
+            db.session.add(LegalPage(key=key, title=title, html=""))
+            log(f"[migrations] página legal '{key}' criada")
+        else:
+            clean = sanitize_html(page.html)
+            if clean != (page.html or ""):
+                page.html = clean
+                log(f"[migrations] HTML de '{key}' sanitizado")
+    db.session.commit()
+
+
+def quote_request_indexes(log=print) -> None:
+    """
+    Índices compostos do CRM (tabelas antigas não recebem do create_all).
+    """
+    _create_index("ix_quote_requests_created_id", "quote_requests", "created_at, id")
+    _create_index("ix_quote_requests_status_created", "quote_requests", "status, created_at, id")
+    _create_index("ix_quote_requests_category_created", "quote_requests", "category, created_at, id")
+    _create_index("ix_quote_requests_source_created", "quote_requests", "source, created_at, id")
+
+
+def ingest_keys(log=print) -> None:
+    """
+    ingest_key único nas tabelas de leads (ingestão em lote, app/ingest.py)
+    e ip_addr/user_agent em contact_messages, que /api/contact já envia.
+    """
+    _add_column("contact_messages", "ip_addr", "VARCHAR(64)")
+    _add_column("contact_messages", "user_agent", "TEXT")
+    for table in ("quote_requests", "contact_messages"):
+        _add_column(table, "ingest_key", "VARCHAR(32)")
+        _create_index(f"ux_{table}_ingest_key", table, "ingest_key", unique=True)
+
+
+def quote_request_fingerprint(log=print) -> None:
+    """
+    Impressão digital das cotações (supressão de duplicatas em /api/quote).
+    Linhas antigas ficam sem: a janela de deduplicação é de minutos.
+    """
+    _add_column("quote_requests", "fingerprint", "VARCHAR(40)")
+    _create_index("ix_quote_requests_fingerprint", "quote_requests", "fingerprint, created_at")
+
+
+def quote_request_dates(log=print, chunk: int = 1000) -> None:
+    """
+    Colunas DATE pickup_on/drop_on + backfill a partir do texto legado
+    (ISO, dd/mm/aaaa, ...), em lotes por id. Textos que não são datas
+    ficam NULL. O índice de texto em pickup_date sai.
+    """
+    from .models import parse_form_date
+
+    _add_column("quote_requests", "pickup_on", "DATE")
+    _add_column("quote_requests", "drop_on", "DATE")
+
+    last_id, filled, unparsed = 0, 0, 0
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, pickup_date, drop_date FROM quote_requests "
+            "WHERE id > :last AND pickup_on IS NULL AND drop_on IS NULL "
+            "ORDER BY id LIMIT :n"
+        ), {"last": last_id, "n": chunk}).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = []
+        for r in rows:
+            p, d = parse_form_date(r.pickup_date), parse_form_date(r.drop_date)
+            if p is None and d is None:
+                unparsed += 1
+                continue
+            updates.append({"id": r.id, "p": p, "d": d})
+        if updates:
+            db.session.execute(
+                text("UPDATE quote_requests SET pickup_on = :p, drop_on = :d WHERE id = :id"),
+                updates,
+            )
+        db.session.commit()
+        filled += len(updates)
+
+    db.session.execute(text("DROP INDEX IF EXISTS ix_quote_requests_pickup_date"))
+    db.session.commit()
+    _create_index("ix_quote_requests_pickup_on", "quote_requests", "pickup_on")
+    _create_index("ix_quote_requests_place_pickup_on", "quote_requests", "pickup_place, pickup_on")
+    if filled or unparsed:
+        log(f"[migrations] datas tipadas: {filled} cotação(ões) preenchida(s), {unparsed} sem data válida")
+
+
+def quote_rollups(log=print) -> None:
+    """
+    Tabelas de rollup (create_all) + carga inicial a partir das cotações.
+    """
+    from .analytics import refresh_rollups, watermark_info
+
+    if watermark_info() is None:
+        refresh_rollups(full=True, log=log)
+
+
+def contact_message_indexes(log=print) -> None:
+    """
+    Keyset (created_at, id) da exportação de mensagens.
+    """
+    _create_index("ix_contact_messages_created_id", "contact_messages", "created_at, id")
+
+
+def faq_search(log=print) -> None:
+    """
+    Coluna search_text (backfill) + índice GIN de tsvector no PostgreSQL.
+    """
+    from .faq import FAQ_TSVECTOR, search_text
+
+    _add_column("faq_items", "search_text", "TEXT")
+    rows = db.session.execute(text(
+        "SELECT id, question, answer FROM faq_items WHERE search_text IS NULL"
+    )).all()
+    for r in rows:
+        db.session.execute(
+            text("UPDATE faq_items SET search_text = :t WHERE id = :id"),
+            {"t": search_text(r.question, r.answer), "id": r.id},
+        )
+    db.session.commit()
+    if rows:
+        log(f"[migrations] search_text preenchido em {len(rows)} pergunta(s) do FAQ")
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_faq_items_search ON faq_items USING GIN (({FAQ_TSVECTOR}))"
+        ))
+        db.session.commit()
+
+
+def category_image_key(log=print) -> None:
+    """
+    Chave das imagens movidas para o storage externo
+    (scripts/migrate_images_to_storage.py faz a cópia dos blobs).
+    """
+    _add_column("featured_categories", "image_key", "VARCHAR(255)")
+
+
+# novos passos sempre no FIM da lista (a posição define a versão)
+STEPS = [
+    category_image_metadata,
+    category_image_size,
+    seed_legal_pages,
+    quote_request_indexes,
+    ingest_keys,
+    quote_request_fingerprint,
+    quote_request_dates,
+    quote_rollups,
+    contact_message_indexes,
+    faq_search,
+    category_image_key,
+]
+
+
+# versão esperada do schema = número de passos conhecidos por este código
+SCHEMA_VERSION = len(STEPS)
+
+
+def current_schema_version() -> int | None:
+    from .models import SchemaMigration
+
+    try:
+        return db.session.execute(db.select(SchemaMigration.version)).scalar()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return None
+
+
+def upgrade(log=print) -> int:
+    from .models import SchemaMigration
+
+    db.create_all()
+    for step in STEPS:
+        step(log=log)
+
+    row = db.session.get(SchemaMigration, 1)
+    if not row:
+        row = SchemaMigration(id=1)
+        db.session.add(row)
+    row.version = SCHEMA_VERSION
+    row.applied_at = datetime.utcnow()
+    db.session.commit()
+    log(f"[migrations] schema na versão {SCHEMA_VERSION}")
+    return SCHEMA_VERSION
+
+
+def check_schema(logger) -> bool:
+    """
+    Uma única query: avisa se o banco está atrás do código.
+    """
+    version = current_schema_version()
+    if version is None or version < SCHEMA_VERSION:
+        logger.warning(
+            f"schema do banco na versão {version}, código espera {SCHEMA_VERSION}: "
+            f"rode scripts/init_db.py"
+        )
+        return False
+    return True
@@ -1,15 +1,24 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from .extensions import db
+from .cache import VersionedCache
 
 # ----- Mensagens de contato (já existia) -----
 class ContactMessage(db.Model):
     __tablename__ = "contact_messages"
+    __table_args__ = (
+        db.Index("ux_contact_messages_ingest_key", "ingest_key", unique=True),
+        db.Index("ix_contact_messages_created_id", "created_at", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     email = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ip_addr = db.Column(db.String(64), nullable=True)
+    user_agent = db.Column(db.Text, nullable=True)
+    # chave de idempotência da ingestão (app/ingest.py)
+    ingest_key = db.Column(db.String(32), nullable=True)
 
     def __repr__(self) -> str:
         return f"<ContactMessage {self.id} {self.email}>"
@@ -23,8 +32,8 @@ class SiteSetting(db.Model):
 
     @staticmethod
     def get_value(key: str, default: str | None = None) -> str | None:
-        s = SiteSetting.query.filter_by(key=key).first()
-        return s.value if s and s.value is not None else default
+        v = settings_cache.get().get(key)
+        return v if v is not None else default
 
     @staticmethod
     def set_value(key: str, value: str | None) -> "SiteSetting":
@@ -35,12 +44,39 @@ class SiteSetting(db.Model):
         else:
             s.value = value
         db.session.commit()
+        settings_cache.invalidate()
         return s
 
     @staticmethod
     def get_settings() -> dict[str, str | None]:
         # Retorna todas as chaves/valores de configuração em um dicionário
-        return {s.key: s.value for s in SiteSetting.query.all()}
+        return dict(settings_cache.get())
+
+    @staticmethod
+    def _load_all() -> dict[str, str | None]:
+        # uma única query para a tabela inteira (é pequena)
+        return dict(db.session.execute(db.select(SiteSetting.key, SiteSetting.value)).all())
+
+
+# leituras servidas da memória; set_value invalida em todos os workers
+settings_cache = VersionedCache("settings", SiteSetting._load_all)
+
+
+# ----- Carimbos de versão dos caches (ver app/cache.py) -----
+class CacheVersion(db.Model):
+    __tablename__ = "cache_versions"
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<CacheVersion {self.key}={self.version}>"
+
+# ----- Versão do schema (ver app/migrations.py) -----
+class SchemaMigration(db.Model):
+    __tablename__ = "schema_migrations"
+    id = db.Column(db.Integer, primary_key=True)   # linha única (id=1)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 # ----- Frota Destaque -----
 class FeaturedCategory(db.Model):
@@ -52,7 +88,16 @@ class FeaturedCategory(db.Model):
     active = db.Column(db.Boolean, nullable=False, default=True)
     position = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    image = db.Column(db.LargeBinary)
+    # blob fora das cargas padrão: listagens não trazem as fotos do banco.
+    # raiseload => acesso acidental a c.image levanta erro em vez de N queries;
+    # só a rota /uploads/category/<id> lê o conteúdo (via select explícito).
+    image = db.deferred(db.Column(db.LargeBinary), raiseload=True)
+    # metadados do upload: permitem ETag/URL versionada sem ler o blob
+    image_hash = db.Column(db.String(64), index=True)   # sha256 do conteúdo
+    image_mime = db.Column(db.String(40))
+    image_size = db.Column(db.Integer)                  # bytes do original
+    # chave no storage externo (app/storage.py); com ela, `image` fica NULL
+    image_key = db.Column(db.String(255))
 
     items = db.relationship(
         "FeaturedItem",
@@ -62,6 +107,18 @@ class FeaturedCategory(db.Model):
         order_by="FeaturedItem.position.asc()",
     )
 
+    @property
+    def has_image(self) -> bool:
+        return bool(self.image_hash)
+
+    def set_image(self, data: bytes) -> None:
+        from .images import content_hash, sniff_mime
+        self.image = data
+        self.image_hash = content_hash(data)
+        self.image_mime = sniff_mime(data)
+        self.image_size = len(data)
+        self.image_url = None  # desativa caminho antigo
+
     def __repr__(self) -> str:
         return f"<FeaturedCategory {self.slug} active={self.active}>"
 
@@ -84,17 +141,49 @@ class FeaturedItem(db.Model):
         return f"<FeaturedItem {self.title} active={self.active}>"
 
 # --- CRM: pedidos de cotação ---
+# formatos aceitos nas datas do formulário (o input date manda ISO; as
+# linhas antigas/integrações trazem dd/mm/aaaa e variações)
+FORM_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%d/%m/%y", "%m/%d/%Y")
+
+
+def parse_form_date(value: str | None) -> date | None:
+    """Data do formulário -> date (None se não der para interpretar)."""
+    value = (value or "").strip()
+    if len(value) > 10 and value[4:5] == "-" and value[10:11] in ("T", " "):
+        value = value[:10]  # datetime ISO: fica só a data
+    for fmt in FORM_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
 class QuoteRequest(db.Model):
     __tablename__ = "quote_requests"
+    # índices da paginação por keyset (created_at, id) com os filtros do CRM
+    __table_args__ = (
+        db.Index("ix_quote_requests_created_id", "created_at", "id"),
+        db.Index("ix_quote_requests_status_created", "status", "created_at", "id"),
+        db.Index("ix_quote_requests_category_created", "category", "created_at", "id"),
+        db.Index("ix_quote_requests_source_created", "source", "created_at", "id"),
+        db.Index("ix_quote_requests_pickup_on", "pickup_on"),
+        db.Index("ix_quote_requests_place_pickup_on", "pickup_place", "pickup_on"),
+        db.Index("ux_quote_requests_ingest_key", "ingest_key", unique=True),
+        db.Index("ix_quote_requests_fingerprint", "fingerprint", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     # dados do formulário
     pickup_place = db.Column(db.String(160), nullable=False)
-    pickup_date = db.Column(db.String(20), nullable=False)   # ISO (yyyy-mm-dd) vindo do input date
+    pickup_date = db.Column(db.String(20), nullable=False)   # texto como veio (input date = ISO)
     drop_place   = db.Column(db.String(160), nullable=False)
     drop_date    = db.Column(db.String(20), nullable=False)
+    # as mesmas datas tipadas (NULL se o texto não for uma data): filtros e relatórios
+    pickup_on = db.Column(db.Date, nullable=True)
+    drop_on   = db.Column(db.Date, nullable=True)
 
     name     = db.Column(db.String(120), nullable=False)
     phone    = db.Column(db.String(50),  nullable=False)
@@ -105,11 +194,33 @@ class QuoteRequest(db.Model):
     user_agent = db.Column(db.Text,        nullable=True)
     ip_addr    = db.Column(db.String(64),  nullable=True)
     status     = db.Column(db.String(24),  nullable=False, default="novo")  # novo | em_contato | concluido
+    ingest_key = db.Column(db.String(32),  nullable=True)   # idempotência da ingestão (app/ingest.py)
+    fingerprint = db.Column(db.String(40), nullable=True)   # telefone+datas+categoria (duplicatas)
 
     def __repr__(self) -> str:
         return f"<QuoteRequest id={self.id} {self.name} {self.pickup_date}->{self.drop_date}>"
 
 
+# --- Rollups diários das cotações (app/analytics.py) ---
+class QuoteDailyRollup(db.Model):
+    __tablename__ = "quote_daily_rollups"
+    day          = db.Column(db.Date,        primary_key=True)   # dia (UTC) de created_at
+    category     = db.Column(db.String(80),  primary_key=True)
+    pickup_place = db.Column(db.String(160), primary_key=True)
+    source       = db.Column(db.String(80),  primary_key=True)
+    status       = db.Column(db.String(24),  primary_key=True)
+    lead_bucket  = db.Column(db.String(8),   primary_key=True)   # faixa de pickup_on - created_at
+    count        = db.Column(db.Integer,     nullable=False, default=0)
+    lead_days_sum = db.Column(db.Integer,    nullable=False, default=0)
+
+
+class RollupWatermark(db.Model):
+    __tablename__ = "rollup_watermarks"
+    name = db.Column(db.String(40), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)   # maior id já agregado
+    refreshed_at = db.Column(db.DateTime, nullable=True)
+
+
 class Location(db.Model):
     __tablename__ = "locations"
 
@@ -122,17 +233,29 @@ class Location(db.Model):
         return f"<Location {self.id} {self.name!r} active={self.active}>"
 
 # --- Páginas legais editáveis no admin ----------------------------
+# chave -> título padrão; linhas semeadas pelo scripts/init_db.py
+LEGAL_PAGES = {
+    "privacy": "Política de Privacidade",
+    "terms": "Termos de Uso",
+}
+
+
 class LegalPage(db.Model):
     __tablename__ = "legal_pages"
     id = db.Column(db.Integer, primary_key=True)
     # key: "privacy" ou "terms"
     key = db.Column(db.String(32), unique=True, nullable=False)
     title = db.Column(db.String(120), nullable=False)
-    html = db.Column(db.Text, nullable=False, default="")
+    html = db.Column(db.Text, nullable=False, default="")   # já sanitizado
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    def set_html(self, html: str | None) -> None:
+        from .sanitize import sanitize_html
+        self.html = sanitize_html(html)
+
     @staticmethod
     def get_or_create(key: str, title: str):
+        # uso no admin; as rotas públicas leem via get_public (somente leitura)
         obj = LegalPage.query.filter_by(key=key).first()
         if not obj:
             obj = LegalPage(key=key, title=title, html="")
@@ -140,6 +263,24 @@ class LegalPage(db.Model):
             db.session.commit()
         return obj
 
+    @staticmethod
+    def get_public(key: str) -> dict:
+        page = legal_cache.get().get(key)
+        if page is None:
+            # ainda não semeada: mostra vazia, sem gravar nada num GET
+            page = {"key": key, "title": LEGAL_PAGES.get(key, ""), "html": "", "updated_at": None}
+        return page
+
+    @staticmethod
+    def _load_all() -> dict[str, dict]:
+        return {
+            p.key: {"key": p.key, "title": p.title, "html": p.html or "", "updated_at": p.updated_at}
+            for p in LegalPage.query.all()
+        }
+
+
+legal_cache = VersionedCache("legal", LegalPage._load_all)
+
 
 class FaqItem(db.Model):
     __tablename__ = "faq_items"
@@ -150,6 +291,8 @@ class FaqItem(db.Model):
     position = db.Column(db.Integer, nullable=False, default=0)
     active = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # pergunta + resposta sem HTML/acentos (app/faq.py); base da busca full-text
+    search_text = db.Column(db.Text, nullable=True)
 
     def __repr__(self) -> str:
         return f"<FaqItem {self.id} {self.question!r}>"
@@ -0,0 +1,245 @@
+"""
+Cache de respostas renderizadas das páginas públicas.
+
+Guarda o HTML já comprimido (gzip) + ETag por (path, idioma); a resposta
+gzip leva o ETag com sufixo "-gz". Cada entrada registra a versão dos
+dados de que depende ("categories", "settings", "faq", "legal"); se algum
+carimbo mudou (app/cache.py), a página é renderizada de novo. Na invalidação local, as entradas dependentes são
+purgadas na hora.
+
+Backends (PAGE_CACHE_BACKEND): "memory" (LRU por processo), "filesystem"
+(compartilhado entre workers do mesmo host, em PAGE_CACHE_DIR) ou "off".
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any
+
+from flask import current_app, make_response, request
+from werkzeug.http import parse_date
+
+from .cache import current_versions, on_invalidate
+
+# idiomas do index.html (?lang=); qualquer outro valor cai em "pt"
+LANGS = ("pt", "en", "es")
+
+
+# ---------- backends ----------
+class MemoryLRUBackend:
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def purge(self, namespace: str | None = None) -> int:
+        with self._lock:
+            keys = [k for k, e in self._data.items() if namespace is None or namespace in e["deps"]]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+
+class FilesystemBackend:
+    """
+    Um arquivo por página: cabeçalho JSON numa linha + corpo gzip.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(key.encode()).hexdigest() + ".page")
+
+    @staticmethod
+    def _read(path: str, with_body: bool = True) -> dict[str, Any] | None:
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(f.readline())
+                if with_body:
+                    entry["body_gz"] = f.read()
+                return entry
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        entry = self._read(self._path(key))
+        return entry if entry and entry.get("key") == key else None
+
+    def set(self, key: str, entry: dict[str, Any]) -> None:
+        meta = {k: v for k, v in entry.items() if k != "body_gz"}
+        meta["key"] = key
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(meta).encode() + b"\n")
+                f.write(entry["body_gz"])
+            os.replace(tmp, self._path(key))
+        except OSError:
+            pass
+
+    def purge(self, namespace: str | None = None) -> int:
+        n = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".page"):
+                continue
+            path = os.path.join(self.root, name)
+            entry = self._read(path, with_body=False)
+            if namespace is None or entry is None or namespace in entry.get("deps", {}):
+                try:
+                    os.remove(path)
+                    n += 1
+                except OSError:
+                    pass
+        return n
+
+
+# ---------- cache ----------
+class PageCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl  # intervalo entre checagens de versão
+        self.hits = 0
+        self.misses = 0
+        self._watched: set[str] = set()
+
+    def watch(self, namespaces) -> None:
+        for ns in namespaces:
+            if ns not in self._watched:
+                self._watched.add(ns)
+                on_invalidate(ns, self.backend.purge)
+
+    def purge(self, namespace: str | None = None) -> int:
+        return self.backend.purge(namespace)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def init_page_cache(app) -> None:
+    kind = (app.config.get("PAGE_CACHE_BACKEND") or "memory").lower()
+    if kind == "off":
+        backend = None
+    elif kind == "filesystem":
+        tmp_root = os.environ.get("TMPDIR") or "/tmp"
+        backend = FilesystemBackend(
+            app.config.get("PAGE_CACHE_DIR") or os.path.join(tmp_root, "page_cache")
+        )
+    else:
+        backend = MemoryLRUBackend(int(app.config.get("PAGE_CACHE_MAX_ENTRIES", 128)))
+    app.extensions["page_cache"] = (
+        PageCache(backend, float(app.config.get("PAGE_CACHE_TTL", 5))) if backend else None
+    )
+
+
+def get_page_cache() -> PageCache | None:
+    return current_app.extensions.get("page_cache")
+
+
+def _cache_key() -> str | None:
+    """
+    Só páginas "limpas" entram no cache: GET sem credenciais e sem query
+    string além de ?lang= (evita explosão de chaves / envenenamento).
+    """
+    if request.method != "GET" or request.authorization:
+        return None
+    if any(k != "lang" for k in request.args):
+        return None
+    lang = request.args.get("lang", "pt")
+    return f"{request.path}|{lang if lang in LANGS else 'pt'}"
+
+
+def _not_modified(entry: dict[str, Any], etag: str) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    last_modified = parse_date(entry.get("last_modified"))
+    ims = request.if_modified_since
+    return bool(last_modified and ims and last_modified <= ims)
+
+
+def _serve(entry: dict[str, Any]):
+    # ETag forte por representação: gzip e identidade têm bytes diferentes
+    use_gzip = "gzip" in request.accept_encodings
+    etag = entry["etag"] + ("-gz" if use_gzip else "")
+    if _not_modified(entry, etag):
+        resp = make_response("", 304)
+    elif use_gzip:
+        resp = make_response(entry["body_gz"])
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp = make_response(gzip.decompress(entry["body_gz"]))
+    resp.mimetype = entry["mimetype"]
+    resp.set_etag(etag)
+    if entry.get("last_modified"):
+        resp.headers["Last-Modified"] = entry["last_modified"]
+    resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+    resp.headers["X-Page-Cache"] = entry.get("_status", "HIT")
+    return resp
+
+
+def cached_page(*deps: str):
+    """
+    Decorator de view: serve do cache enquanto as versões de `deps` não mudarem.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_page_cache()
+            key = _cache_key() if cache else None
+            if key is None:
+                return view(*args, **kwargs)
+
+            cache.watch(deps)
+            versions = current_versions(deps, cache.ttl)
+            entry = cache.backend.get(key)
+            if entry is not None and entry["deps"] == versions:
+                cache.hits += 1
+                return _serve(entry)
+
+            cache.misses += 1
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.direct_passthrough or "Set-Cookie" in resp.headers:
+                return resp
+            body = resp.get_data()
+            entry = {
+                "body_gz": gzip.compress(body, compresslevel=6),
+                "etag": hashlib.sha1(body).hexdigest(),
+                "mimetype": resp.mimetype,
+                "deps": versions,
+                "last_modified": resp.headers.get("Last-Modified"),
+                "created": time.time(),
+            }
+            cache.backend.set(key, entry)
+            return _serve(dict(entry, _status="MISS"))
+
+        return wrapper
+
+    return decorator
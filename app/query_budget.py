@@ -0,0 +1,139 @@
+"""
+Orçamento de queries por view e detector de N+1 (desenvolvimento/testes).
+
+Cada view pode declarar quantas queries SQL uma requisição pode fazer com
+os caches frios:
+
+    @site_bp.get("/")
+    @query_budget(4)
+    @cached_page(...)
+    def home(): ...
+
+QUERY_BUDGET_MODE (usa a contagem de app/metrics.py):
+- off (padrão): nada além das métricas;
+- warn: loga (logger "app.query_budget") quando a requisição passa do
+  orçamento ou repete o mesmo statement N_PLUS_ONE_REPEAT vezes ou mais
+  (lazy load dentro de um loop); as respostas levam X-Query-Count e
+  X-Query-Budget;
+- strict: idem, mas levanta QueryBudgetExceeded (500), para testes.
+
+Views sem @query_budget usam QUERY_BUDGET_DEFAULT, se definido.
+scripts/check_query_budgets.py percorre as rotas e sai com 1 se alguma
+estourar o orçamento.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections import Counter, deque
+
+from flask import current_app
+
+from .metrics import add_finish_hook, add_statement_hook
+
+MODES = ("off", "warn", "strict")
+N_PLUS_ONE_REPEAT = 3
+VIOLATIONS_SIZE = 100
+
+log = logging.getLogger("app.query_budget")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_PARAM = re.compile(r"%\(\w+\)s|:\w+|%s")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_queries: int):
+    """Declara o orçamento de queries da view (o atributo sobrevive a @wraps)."""
+
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+def statement_shape(statement: str) -> str:
+    """Normaliza literais e listas de IN para comparar 'a mesma query'."""
+    s = " ".join(statement.split())
+    s = _STRING.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _PARAM.sub("?", s)
+    return _PLACEHOLDERS.sub("(?)", s)
+
+
+class Violations:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items: deque = deque(maxlen=VIOLATIONS_SIZE)
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self.items.append(entry)
+
+    def drain(self) -> list[dict]:
+        with self._lock:
+            out = list(self.items)
+            self.items.clear()
+            return out
+
+
+violations = Violations()
+
+
+def budget_for(endpoint: str) -> int | None:
+    view = current_app.view_functions.get(endpoint)
+    budget = getattr(view, "query_budget", None)
+    if budget is None:
+        budget = current_app.config.get("QUERY_BUDGET_DEFAULT")
+    return budget
+
+
+# ---------- hooks de app/metrics.py ----------
+def _on_statement(state: dict, statement: str, elapsed: float) -> None:
+    shapes = state.get("shapes")
+    if shapes is None:
+        shapes = state["shapes"] = Counter()
+    shapes[statement_shape(statement)] += 1
+
+
+def _on_finish(state: dict, endpoint: str, response) -> None:
+    mode = current_app.config.get("QUERY_BUDGET_MODE", "off")
+    if mode == "off":
+        return
+    count = state["queries"]
+    budget = budget_for(endpoint)
+    repeated = {
+        shape: n for shape, n in (state.get("shapes") or {}).items() if n >= N_PLUS_ONE_REPEAT
+    }
+    response.headers["X-Query-Count"] = str(count)
+    if budget is not None:
+        response.headers["X-Query-Budget"] = str(budget)
+
+    problems = []
+    if budget is not None and count > budget:
+        problems.append(f"{count} queries (orçamento {budget})")
+    for shape, n in repeated.items():
+        problems.append(f"N+1? {n}x {shape[:200]}")
+    if not problems:
+        return
+    violations.add({"endpoint": endpoint, "queries": count, "budget": budget, "problems": problems})
+    message = f"[query-budget] {endpoint}: " + "; ".join(problems)
+    if mode == "strict":
+        raise QueryBudgetExceeded(message)
+    log.warning(message)
+
+
+def init_query_budget(app) -> None:
+    mode = app.config.get("QUERY_BUDGET_MODE", "off")
+    if mode not in MODES:
+        raise ValueError(f"QUERY_BUDGET_MODE inválido: {mode!r} (use {', '.join(MODES)})")
+    if mode == "off" or not app.config.get("METRICS_ENABLED", True):
+        return
+    add_statement_hook(_on_statement)
+    add_finish_hook(_on_finish)
@@ -1,21 +1,38 @@
-﻿import re
-import unicodedata
+﻿import hashlib
+import json
+import re
+from datetime import timezone
 from flask import (
     Blueprint, render_template, request, jsonify,
-    current_app, send_from_directory, url_for
+    current_app, send_from_directory, url_for, make_response
 )
 from app.extensions import db
 from app.models import (
-    Location, QuoteRequest, ContactMessage, SiteSetting,
-    LegalPage, FeaturedCategory
+    Location, SiteSetting,
+    LegalPage, FeaturedCategory, parse_form_date
 )
 from .models import FaqItem
+from .cache import VersionedCache
+from .page_cache import cached_page
+from .query_budget import query_budget
+from .search import PrefixIndex, fold
+from .storage import get_store, load_category_image, variant_key
+from .faq import (
+    FAQ_PAGE_TOP, SEARCH_LIMIT as FAQ_SEARCH_LIMIT, SEARCH_MAX as FAQ_SEARCH_MAX, search_faq,
+)
+from .ingest import quote_fingerprint, submit
+from .images import (
+    FORMAT_BY_MIME, MIME_BY_FORMAT, content_hash, negotiate_format, read_variant,
+    render_variant, sniff_mime, snap_width, variant_etag, variant_path, write_variant,
+)
 
-from supabase import create_client, Client
 import os
 
 site_bp = Blueprint("site", __name__)
 
+# larguras oferecidas no srcset do grid da home
+GRID_IMAGE_WIDTHS = (480, 960, 1280)
+
 
 # ---------- utils ----------
 def digits_only(s: str) -> str:
@@ -26,10 +43,7 @@ def _slug_key(s: str) -> str:
     """
     Normaliza slugs para chave de comparação.
     """
-    s = (s or "").strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    s = re.sub(r"[^a-z0-9]+", "-", s).strip("-")
+    s = fold(s)
 
     # dobras úteis
     if s == "sedans":
@@ -65,6 +79,7 @@ def health_supabase():
 
 # ---------- health & uploads ----------
 @site_bp.get("/health")
+@query_budget(0)
 def health():
     return "ok", 200
 
@@ -74,19 +89,129 @@ from flask import Response
 
 @site_bp.get("/uploads/category/<int:cid>")
 def category_image(cid: int):
-    obj = FeaturedCategory.query.get(cid)
-    if not obj or not obj.image:
+    """
+    Imagem da categoria, com variantes por largura/formato (?w=480&fmt=webp).
+    Os metadados são lidos sem o blob; o blob só é buscado quando a variante
+    ainda não existe no cache em disco.
+    """
+    row = db.session.execute(
+        db.select(FeaturedCategory.image_hash, FeaturedCategory.image_mime, FeaturedCategory.image_key)
+        .where(
+            FeaturedCategory.id == cid,
+            db.or_(FeaturedCategory.image.isnot(None), FeaturedCategory.image_key.isnot(None)),
+        )
+    ).first()
+    if not row:
         return ("", 404)
-    return Response(obj.image, mimetype="image/jpeg")
+    image_hash, image_mime, image_key = row
+
+    legacy_blob = None
+    if not image_hash and not image_key:
+        # registro legado (antes do backfill): hash só em memória; quem grava
+        # é o passo category_image_metadata do scripts/init_db.py, nunca o GET
+        legacy_blob = bytes(db.session.execute(
+            db.select(FeaturedCategory.image).where(FeaturedCategory.id == cid)
+        ).scalar() or b"")
+        if not legacy_blob:
+            return ("", 404)
+        image_hash, image_mime = content_hash(legacy_blob), sniff_mime(legacy_blob)
+
+    original = FORMAT_BY_MIME.get(image_mime or "", "jpeg")
+    width = snap_width(request.args.get("w", type=int))
+    fmt, by_accept = negotiate_format(
+        request.args.get("fmt"), request.headers.get("Accept", ""), original
+    )
+    etag = variant_etag(image_hash, width, fmt)
+
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        path = variant_path(current_app.config["IMAGE_CACHE_DIR"], image_hash, width, fmt)
+        body = read_variant(path)
+        if body is None:
+            if legacy_blob is not None:
+                blob = legacy_blob
+            elif image_key:
+                blob = load_category_image(image_key) or b""
+            else:
+                blob = bytes(db.session.execute(
+                    db.select(FeaturedCategory.image).where(FeaturedCategory.id == cid)
+                ).scalar() or b"")
+            if not blob:
+                return ("", 404)
+            try:
+                body = render_variant(blob, width, fmt, original)
+            except Exception as e:
+                # arquivo que o Pillow não abre: serve o original
+                current_app.logger.warning(f"variante da categoria {cid} falhou: {e}")
+                width, fmt, body = None, original, blob
+                etag = variant_etag(image_hash, width, fmt)
+                path = variant_path(current_app.config["IMAGE_CACHE_DIR"], image_hash, width, fmt)
+            write_variant(path, body)
+        resp = Response(body, mimetype=MIME_BY_FORMAT.get(fmt, "application/octet-stream"))
+
+    resp.set_etag(etag)
+    # URL versionada (?v=<hash>) nunca muda de conteúdo; sem ela, revalida
+    if request.args.get("v") == image_hash[:12]:
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        resp.headers["Cache-Control"] = "public, max-age=300, must-revalidate"
+    if by_accept:
+        resp.vary.add("Accept")
+    return resp
+
+
+def _category_image(c) -> tuple[str, str]:
+    """
+    (src, srcset) da imagem da categoria; URLs versionadas pelo hash.
+    Com storage público (CDN), aponta direto para as larguras gravadas no
+    upload, sem passar pelo app.
+    """
+    if not c.has_image:
+        return _resolve_image_url(c.image_url), ""
+    store = get_store() if c.image_key else None
+    if store is not None and store.url(c.image_key):
+        fmt = FORMAT_BY_MIME.get(c.image_mime or "", "jpeg")
+        if fmt == "gif":
+            return store.url(c.image_key), ""
+        src = store.url(variant_key(c.image_hash, 960, fmt))
+        srcset = ", ".join(
+            f"{store.url(variant_key(c.image_hash, w, fmt))} {w}w" for w in GRID_IMAGE_WIDTHS
+        )
+        return src, srcset
+    v = c.image_hash[:12]
+    src = url_for("site.category_image", cid=c.id, v=v, w=960)
+    srcset = ", ".join(
+        f"{url_for('site.category_image', cid=c.id, v=v, w=w)} {w}w"
+        for w in GRID_IMAGE_WIDTHS
+    )
+    return src, srcset
 
 
-# ---------- páginas ----------
-@site_bp.get("/")
-def home():
-    # WhatsApp do admin
-    whatsapp_raw = SiteSetting.get_value("whatsapp_number", "") or ""
-    whatsapp = digits_only(whatsapp_raw)
+# ---------- grid da home ----------
+# slots fixos exibidos na home
+HOME_GRID_SLOTS = [
+    ("Compacto", "compacto"),
+    ("Sedan", "sedan"),
+    ("SUVs", "suvs"),
+    ("Minivans", "minivans"),
+    ("Luxo", "luxo"),
+    ("Especial", "especial"),
+]
+
+# variantes comuns digitadas no admin
+HOME_GRID_VARIANTS = {
+    "sedan": ["sedans", "sedã", "sedan"],
+    "suvs": ["suv"],
+    "especial": ["special"],
+}
+
 
+def _build_grid_slots() -> list[dict]:
+    """
+    Resolve os slots da home a partir das categorias. Toda a normalização
+    de slug acontece aqui, uma vez por versão de "categories".
+    """
     # categorias indexadas por slug normalizado
     all_cats = {}
     for c in FeaturedCategory.query.all():
@@ -94,40 +219,25 @@ def home():
         if k:
             all_cats[k] = c
 
-    # slots fixos exibidos na home
-    desired = [
-        ("Compacto", "compacto"),
-        ("Sedan", "sedan"),
-        ("SUVs", "suvs"),
-        ("Minivans", "minivans"),
-        ("Luxo", "luxo"),
-        ("Especial", "especial"),
-    ]
-
     grid_slots = []
-    for name, want_slug in desired:
+    for name, want_slug in HOME_GRID_SLOTS:
         c = all_cats.get(_slug_key(want_slug))
         if not c:
-            # variantes comuns digitadas no admin
-            variantes = {
-                "sedan": ["sedans", "sedã", "sedan"],
-                "suvs": ["suv"],
-                "especial": ["special"],
-            }.get(want_slug, [])
-            for v in variantes:
+            for v in HOME_GRID_VARIANTS.get(want_slug, []):
                 c = all_cats.get(_slug_key(v))
                 if c:
                     break
 
         if c:
+            image, srcset = _category_image(c)
             grid_slots.append(
                 {
                     "name": c.name or name,
                     "slug": _slug_key(c.slug),
                     "active": bool(c.active),
                     # >>> AQUI: sempre converte para URL servível
-                    "image": (url_for("site.category_image", cid=c.id)
-          if getattr(c, "image", None) else _resolve_image_url(c.image_url)),
+                    "image": image,
+                    "srcset": srcset,
                 }
             )
         else:
@@ -137,21 +247,96 @@ def home():
                     "slug": want_slug,
                     "active": False,
                     "image": "",
+                    "srcset": "",
                 }
             )
+    return grid_slots
+
 
-    return render_template("index.html", whatsapp=whatsapp, grid_slots=grid_slots)
+# snapshot versionado; o admin reconstrói ao alterar categorias
+home_grid = VersionedCache("categories", _build_grid_slots)
+
+
+# ---------- páginas ----------
+def _inline_locations() -> list[dict] | None:
+    items = locations_cache.get()["items"]
+    return items if len(items) <= LOCATIONS_INLINE_MAX else None
+
+
+@site_bp.get("/")
+@query_budget(4)
+@cached_page("categories", "settings", "locations")
+def home():
+    # WhatsApp do admin
+    whatsapp_raw = SiteSetting.get_value("whatsapp_number", "") or ""
+    whatsapp = digits_only(whatsapp_raw)
+
+    return render_template(
+        "index.html",
+        whatsapp=whatsapp,
+        grid_slots=home_grid.get(),
+        # datalist já vem no HTML: o widget não precisa chamar /api/locations
+        locations=_inline_locations(),
+    )
 
 
 # ---------- API ----------
+# navegador usa a lista por 1 min e revalida em segundo plano por até 10 min
+LOCATIONS_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+
+
+# acima disso a home não embute a lista; o widget usa /api/locations/search
+LOCATIONS_INLINE_MAX = 300
+LOCATIONS_SEARCH_LIMIT = 10
+LOCATIONS_SEARCH_MAX = 50
+
+
+def _load_locations() -> dict:
+    rows = db.session.execute(
+        db.select(Location.id, Location.name, Location.position)
+        .where(Location.active.is_(True))
+        .order_by(Location.position.asc(), Location.id.asc())
+    ).all()
+    items = [{"id": r.id, "name": r.name} for r in rows]
+    body = json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode()
+    return {
+        "items": items,
+        "rows": [tuple(r) for r in rows],
+        "json": body,
+        "digest": hashlib.sha1(body).hexdigest()[:16],
+    }
+
+
+# lista serializada uma vez por versão; o admin invalida ao alterar localidades
+locations_cache = VersionedCache("locations", _load_locations)
+# índice de prefixos, atualizado por diferença quando a lista recarrega
+location_index = PrefixIndex()
+
+
+def search_locations(q: str, limit: int = LOCATIONS_SEARCH_LIMIT) -> list[dict]:
+    data = locations_cache.get()
+    location_index.sync_from(data, data["rows"])
+    return [{"id": i, "name": name} for i, name in location_index.search(q, limit)]
+
+
 @site_bp.get("/api/locations")
+@query_budget(2)
 def api_locations():
-    rows = (
-        Location.query.filter_by(active=True)
-        .order_by(Location.position.asc())
-        .all()
-    )
-    return jsonify([{"id": r.id, "name": r.name} for r in rows])
+    data = locations_cache.get()
+    resp = make_response(data["json"])
+    resp.mimetype = "application/json"
+    resp.set_etag(f"v{locations_cache.version or 0}-{data['digest']}")
+    resp.headers["Cache-Control"] = LOCATIONS_CACHE_CONTROL
+    return resp.make_conditional(request)
+
+
+@site_bp.get("/api/locations/search")
+@query_budget(2)
+def api_locations_search():
+    limit = min(max(request.args.get("limit", LOCATIONS_SEARCH_LIMIT, type=int), 1), LOCATIONS_SEARCH_MAX)
+    resp = jsonify(search_locations(request.args.get("q", ""), limit))
+    resp.headers["Cache-Control"] = LOCATIONS_CACHE_CONTROL
+    return resp
 
 
 @site_bp.post("/api/quote")
@@ -176,7 +361,7 @@ def api_quote():
             400,
         )
 
-    q = QuoteRequest(
+    fields = dict(
         pickup_place=data["pickup_place"].strip(),
         pickup_date=data["pickup_date"].strip(),
         drop_place=data["drop_place"].strip(),
@@ -191,9 +376,15 @@ def api_quote():
         ],
         status="novo",
     )
-    db.session.add(q)
-    db.session.commit()
-    return jsonify(ok=True, id=q.id)
+    fields["pickup_on"] = parse_form_date(fields["pickup_date"])
+    fields["drop_on"] = parse_form_date(fields["drop_date"])
+    result = submit(
+        "quote",
+        fields,
+        idempotency_key=request.headers.get("Idempotency-Key"),
+        fingerprint=quote_fingerprint(fields),
+    )
+    return jsonify(result), 202 if result.get("queued") else 200
 
 
 @site_bp.post("/api/contact")
@@ -209,7 +400,7 @@ def api_contact():
             ),
             400,
         )
-    m = ContactMessage(
+    fields = dict(
         name=data["name"].strip(),
         email=data["email"].strip(),
         message=data["message"].strip(),
@@ -218,33 +409,63 @@ def api_contact():
         ],
         user_agent=request.headers.get("User-Agent", "")[:255],
     )
-    db.session.add(m)
-    db.session.commit()
-    return jsonify(ok=True, id=m.id)
+    result = submit("contact", fields, idempotency_key=request.headers.get("Idempotency-Key"))
+    return jsonify(result), 202 if result.get("queued") else 200
 
 
 # ---------- páginas legais ----------
+def _legal_response(key: str):
+    """
+    Somente leitura (cache em memória); updated_at vira Last-Modified
+    para respostas 304.
+    """
+    page = LegalPage.get_public(key)
+    resp = make_response(render_template("legal_public.html", page=page))
+    if page["updated_at"]:
+        resp.last_modified = page["updated_at"].replace(tzinfo=timezone.utc)
+    resp.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+    return resp.make_conditional(request)
+
+
 @site_bp.get("/privacy")
+@query_budget(2)
+@cached_page("legal")
 def privacy_page():
-    page = LegalPage.get_or_create("privacy", "Política de Privacidade")
-    return render_template("legal_public.html", page=page)
+    return _legal_response("privacy")
 
 
 @site_bp.get("/terms")
+@query_budget(2)
+@cached_page("legal")
 def terms_page():
-    page = LegalPage.get_or_create("terms", "Termos de Uso")
-    return render_template("legal_public.html", page=page)
+    return _legal_response("terms")
 
 
 # ---------- FAQ ----------
 @site_bp.get("/faq")
+@query_budget(3)
+@cached_page("faq", "settings")
 def faq_page():
     whatsapp_raw = SiteSetting.get_value("whatsapp_number", "") or ""
     whatsapp = digits_only(whatsapp_raw)
 
-    items = (
+    # só as primeiras FAQ_PAGE_TOP; as demais aparecem pela busca (ou ?all=1)
+    show_all = request.args.get("all") == "1"
+    q = (
         FaqItem.query.filter_by(active=True)
         .order_by(FaqItem.position.asc(), FaqItem.id.asc())
-        .all()
     )
-    return render_template("faq.html", items=items, whatsapp=whatsapp)
+    items = q.all() if show_all else q.limit(FAQ_PAGE_TOP + 1).all()
+    more = not show_all and len(items) > FAQ_PAGE_TOP
+    return render_template(
+        "faq.html", items=items[:FAQ_PAGE_TOP] if more else items, more=more, whatsapp=whatsapp
+    )
+
+
+@site_bp.get("/api/faq/search")
+@query_budget(2)
+def api_faq_search():
+    limit = min(max(request.args.get("limit", FAQ_SEARCH_LIMIT, type=int), 1), FAQ_SEARCH_MAX)
+    resp = jsonify(search_faq(request.args.get("q", ""), limit))
+    resp.headers["Cache-Control"] = "public, max-age=60"
+    return resp
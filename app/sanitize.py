@@ -0,0 +1,75 @@
+"""
+Sanitização do HTML editado no admin (páginas legais).
+
+O HTML é limpo na gravação e guardado já sanitizado, então a rota
+pública só faz `|safe` sem custo extra por requisição.
+"""
+from __future__ import annotations
+
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "div", "em", "h1", "h2", "h3",
+    "h4", "h5", "h6", "hr", "i", "li", "ol", "p", "pre", "small", "span",
+    "strong", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+ALLOWED_ATTRS = {
+    "a": {"href", "title", "target"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+GLOBAL_ATTRS = {"class", "id"}
+VOID_TAGS = {"br", "hr"}
+# conteúdo descartado por inteiro (não só a tag)
+DROP_CONTENT = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+SAFE_SCHEMES = ("http://", "https://", "mailto:", "tel:", "/", "#")
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT:
+            self._skip += 1
+            return
+        if self._skip or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRS.get(tag, set()) | GLOBAL_ATTRS
+        parts = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == "href" and not value.strip().lower().startswith(SAFE_SCHEMES):
+                continue
+            parts.append(f'{name}="{escape(value, quote=True)}"')
+        if tag == "a" and any(n == "target" for n, _ in attrs):
+            parts.append('rel="noopener noreferrer"')
+        self.out.append(f"<{' '.join(parts)}>")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROP_CONTENT:
+            self._skip -= 1
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT:
+            self._skip = max(0, self._skip - 1)
+            return
+        if self._skip or tag not in ALLOWED_TAGS or tag in VOID_TAGS:
+            return
+        self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.out.append(escape(data, quote=False))
+
+
+def sanitize_html(html: str | None) -> str:
+    parser = _Sanitizer()
+    parser.feed(html or "")
+    parser.close()
+    return "".join(parser.out)
@@ -0,0 +1,257 @@
+"""
+Índices de busca em memória (por processo).
+
+fold() é a normalização de texto usada nas chaves (minúsculas, sem
+acentos, só [a-z0-9] separados por "-"); routes._slug_key parte dela.
+
+PrefixIndex: busca "enquanto digita" por prefixo de palavra. Cada palavra
+do rótulo entra numa trie; a consulta "aero orl" casa itens que têm uma
+palavra começando com "aero" E outra começando com "orl". A lista de ids
+de cada nó (ordenada pelo rank) é montada na primeira consulta que passa
+por ele e descartada quando um item do ramo muda, então as consultas
+seguintes custam só a caminhada na trie + o corte do resultado.
+sync() recebe a lista completa e aplica só a diferença (itens novos,
+removidos ou alterados).
+
+InvertedIndex: busca por palavras (todas precisam aparecer) com stemming
+leve pt/en/es, ranqueada por tf-idf com peso por campo. É o fallback
+da busca do FAQ quando o banco não tem full-text (SQLite).
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Iterable
+
+
+def fold(s: str) -> str:
+    """'São Paulo (GRU)' -> 'sao-paulo-gru'."""
+    s = (s or "").strip().lower()
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return re.sub(r"[^a-z0-9]+", "-", s).strip("-")
+
+
+def tokenize(s: str) -> list[str]:
+    key = fold(s)
+    return key.split("-") if key else []
+
+
+# ---------- stemming leve (pt/en/es) ----------
+STOPWORDS = frozenset("""
+    a o as os um uma uns umas de do da dos das em no na nos nas por para pra com sem
+    e ou que se ao aos eu voce meu minha seu sua nao sim como qual quais quando onde
+    the an and or of to in on at for with is are be it my your can do does how what
+    el la los las un una y en por con del al es son mi tu su que como cual cuando donde
+""".split())
+
+# mais longos primeiro; já sem acentos (fold)
+def _by_length(words: str) -> tuple[str, ...]:
+    return tuple(sorted(set(words.split()), key=len, reverse=True))
+
+
+# derivação (já com as formas no plural)
+_DERIVATIONAL = _by_length("""
+    amentos imentos amento imento aciones acoes icoes ucoes acion acao icao ucao
+    idades idade mente ations ation ings ing edly ivos ivas ivo iva ed ly
+""")
+_PLURAL = _by_length("ais eis ies es s")
+# plurais de -ão (já sem til): cauções/cartões/grãos -> -ao, como o singular
+_AO_PLURAL = re.compile(r"(?<=[a-z]{2})(?:oes|aes|aos)$")
+_GENDER = _by_length("a o e")
+
+
+def _strip(word: str, suffixes: tuple[str, ...]) -> str:
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def stem(word: str) -> str:
+    """
+    Corta, nesta ordem e no máximo uma vez cada, um sufixo de derivação
+    (-ção, -mente, -ing...), o plural e a vogal de gênero:
+    inclusos -> incluso -> inclus, igual a inclusa -> inclus. Plurais de
+    -ão viram -ao antes: cartoes -> cartao -> carta, igual a cartao.
+    """
+    if word.isdigit():
+        return word
+    word = _AO_PLURAL.sub("ao", word)
+    for suffixes in (_DERIVATIONAL, _PLURAL, _GENDER):
+        word = _strip(word, suffixes)
+    return word
+
+
+def terms(s: str) -> list[str]:
+    return [stem(t) for t in tokenize(s) if t not in STOPWORDS]
+
+
+class _Node:
+    __slots__ = ("children", "ids", "ranked", "members")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.ids: set = set()          # itens com uma palavra que termina aqui
+        self.ranked: list | None = None  # cache: ids do ramo, pelo rank
+        self.members: frozenset | None = None
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._root = _Node()
+        self._items: dict[Any, tuple[str, Any]] = {}  # id -> (rótulo, rank)
+        self._tokens: dict[Any, set[str]] = {}
+        self._ordinal: dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self.source = None  # objeto usado no último sync (ver sync_from)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # ---------- manutenção ----------
+    def sync(self, rows: Iterable[tuple[Any, str, Any]]) -> int:
+        """
+        rows: (id, rótulo, rank) de todos os itens. Aplica só o que mudou;
+        retorna quantos itens foram incluídos/removidos/alterados.
+        """
+        wanted = {item_id: (label, rank) for item_id, label, rank in rows}
+        with self._lock:
+            stale = [i for i, entry in self._items.items() if wanted.get(i) != entry]
+            for item_id in stale:
+                self._remove(item_id)
+            fresh = [i for i in wanted if i not in self._items]
+            for item_id in fresh:
+                self._add(item_id, *wanted[item_id])
+            if stale or fresh:
+                self._reorder()
+            return len(set(stale) | set(fresh))
+
+    def _reorder(self) -> None:
+        # posição global de cada item: ordenar um ramo vira ordenar inteiros
+        ordered = sorted(self._items, key=lambda i: (self._items[i][1], i))
+        self._ordinal = {item_id: n for n, item_id in enumerate(ordered)}
+        self._root.ranked = ordered
+        self._root.members = frozenset(ordered)
+
+    def sync_from(self, source, rows: Iterable[tuple[Any, str, Any]]) -> None:
+        """sync() só quando `source` (ex.: o valor de um VersionedCache) mudou."""
+        if source is not self.source:
+            self.sync(rows)
+            self.source = source
+
+    def _add(self, item_id, label: str, rank) -> None:
+        self._items[item_id] = (label, rank)
+        tokens = set(tokenize(label))
+        self._tokens[item_id] = tokens
+        self._root.ranked = self._root.members = None
+        for token in tokens:
+            node = self._root
+            for ch in token:
+                node = node.children.setdefault(ch, _Node())
+                node.ranked = node.members = None
+            node.ids.add(item_id)
+
+    def _remove(self, item_id) -> None:
+        self._items.pop(item_id, None)
+        self._root.ranked = self._root.members = None
+        for token in self._tokens.pop(item_id, ()):
+            path = [self._root]
+            for ch in token:
+                path.append(path[-1].children[ch])
+                path[-1].ranked = path[-1].members = None
+            path[-1].ids.discard(item_id)
+            # poda os nós que ficaram vazios
+            for depth in range(len(token), 0, -1):
+                node = path[depth]
+                if node.ids or node.children:
+                    break
+                del path[depth - 1].children[token[depth - 1]]
+
+    # ---------- consulta ----------
+    def _find(self, prefix: str) -> _Node | None:
+        node = self._root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _ranked(self, node: _Node) -> list:
+        if node.ranked is None:
+            found, stack = set(), [node]
+            while stack:
+                n = stack.pop()
+                found.update(n.ids)
+                stack.extend(n.children.values())
+            node.ranked = sorted(found, key=self._ordinal.__getitem__)
+            node.members = frozenset(found)
+        return node.ranked
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[Any, str]]:
+        """[(id, rótulo)] dos itens que casam todas as palavras, pelo rank."""
+        tokens = sorted(set(tokenize(query)))
+        with self._lock:
+            nodes = []
+            for token in tokens or [""]:
+                node = self._find(token)
+                if node is None:
+                    return []
+                self._ranked(node)
+                nodes.append(node)
+            # percorre o ramo mais seletivo e confere os demais por conjunto
+            nodes.sort(key=lambda n: len(n.members))
+            others = [n.members for n in nodes[1:]]
+            out = []
+            for item_id in nodes[0].ranked:
+                if all(item_id in m for m in others):
+                    out.append((item_id, self._items[item_id][0]))
+                    if len(out) >= limit:
+                        break
+            return out
+
+
+class InvertedIndex:
+    """
+    Índice imutável: monte um novo quando os documentos mudarem.
+    docs: (id, rank, [(texto, peso), ...]); rank desempata (menor primeiro).
+    """
+
+    def __init__(self, docs: Iterable[tuple[Any, Any, list[tuple[str, float]]]]):
+        self._postings: dict[str, dict[Any, float]] = {}
+        self._rank: dict[Any, Any] = {}
+        for doc_id, rank, fields in docs:
+            self._rank[doc_id] = rank
+            weights: Counter = Counter()
+            for text, weight in fields:
+                for term in terms(text):
+                    weights[term] += weight
+            for term, w in weights.items():
+                self._postings.setdefault(term, {})[doc_id] = w
+
+    def __len__(self) -> int:
+        return len(self._rank)
+
+    def search(self, query: str, limit: int = 10) -> list[Any]:
+        wanted = set(terms(query))
+        if not wanted:
+            return []
+        postings = []
+        for term in wanted:
+            docs = self._postings.get(term)
+            if not docs:
+                return []
+            postings.append(docs)
+        postings.sort(key=len)
+        total = len(self._rank)
+        scores = {}
+        for doc_id in postings[0]:
+            if all(doc_id in p for p in postings[1:]):
+                scores[doc_id] = sum(
+                    (1 + math.log(p[doc_id])) * math.log(1 + total / len(p)) for p in postings
+                )
+        best = sorted(scores, key=lambda d: (-scores[d], self._rank[d], d))
+        return best[:limit]
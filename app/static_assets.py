@@ -0,0 +1,142 @@
+"""
+Estáticos com fingerprint e pré-comprimidos.
+
+scripts/build_static.py copia app/static/** para app/static/dist/ com o
+hash do conteúdo no nome (css/custom.css -> dist/css/custom.3f2a1b9c7d.css),
+gera .gz/.br dos arquivos de texto e grava dist/manifest.json.
+
+Com o manifest presente:
+- url_for('static', filename='css/custom.css') aponta para a cópia com
+  hash (url_defaults), que pode ficar em cache por um ano (immutable);
+- a view de estáticos entrega o .br/.gz vizinho quando o cliente aceita.
+Sem o manifest (dev), tudo funciona como o static padrão do Flask.
+
+scripts/build_images.py gera, para as imagens de static/assets, larguras
+responsivas em AVIF/WebP/formato original em static/variants/ (nomes com
+hash, também immutable) e variants/manifest.json; o helper Jinja
+`picture()` emite <picture>/srcset a partir dele e cai num <img> simples
+quando a imagem não passou pelo build.
+"""
+from __future__ import annotations
+
+import json
+import mimetypes
+import os
+from functools import lru_cache
+
+from flask import current_app, request, send_from_directory, url_for
+from markupsafe import Markup, escape
+
+DIST_DIR = "dist"
+VARIANTS_DIR = "variants"
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+# extensões que o build pré-comprime
+COMPRESSIBLE_EXTS = {".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".html", ".map", ".webmanifest"}
+SUFFIX_BY_ENCODING = {"br": ".br", "gzip": ".gz"}
+
+
+# formatos modernos em ordem de preferência (<source> antes do <img>)
+MODERN_FORMATS = (("avif", "image/avif"), ("webp", "image/webp"))
+
+
+def load_manifest(static_folder: str, subdir: str = DIST_DIR) -> dict:
+    try:
+        with open(os.path.join(static_folder, subdir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _static_url_defaults(endpoint, values) -> None:
+    if endpoint != "static":
+        return
+    manifest = current_app.extensions.get("static_manifest") or {}
+    filename = values.get("filename")
+    hashed = manifest.get(filename)
+    if hashed:
+        values["filename"] = f"{DIST_DIR}/{hashed}"
+
+
+def static_view(filename: str):
+    folder = current_app.static_folder
+    if not filename.startswith((DIST_DIR + "/", VARIANTS_DIR + "/")):
+        return current_app.send_static_file(filename)
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    resp = None
+    # o .br só existe se o build rodou com brotli instalado
+    for enc in ("br", "gzip"):
+        variant = filename + SUFFIX_BY_ENCODING[enc]
+        if request.accept_encodings[enc] and os.path.isfile(os.path.join(folder, variant)):
+            resp = send_from_directory(folder, variant, mimetype=mimetype)
+            resp.headers["Content-Encoding"] = enc
+            break
+    if resp is None:
+        resp = send_from_directory(folder, filename, mimetype=mimetype)
+
+    if os.path.splitext(filename)[1] in COMPRESSIBLE_EXTS:
+        resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = IMMUTABLE
+    return resp
+
+
+# ---------- imagens responsivas ----------
+def _srcset(variants: list) -> str:
+    return ", ".join(f"{url_for('static', filename=path)} {w}w" for w, path in variants)
+
+
+def picture(filename: str, alt: str = "", sizes: str = "100vw", cls: str | None = None,
+            loading: str = "lazy", fallback_width: int = 960, **attrs) -> Markup:
+    """
+    {{ picture('assets/garage.jpg', 'Garagem', sizes='(min-width: 992px) 50vw, 100vw') }}
+    """
+    entry = (current_app.extensions.get("image_manifest") or {}).get(filename)
+    extra = {"class": cls, "loading": loading, "decoding": "async", **attrs}
+    if not entry:
+        return Markup(f'<img src="{escape(url_for("static", filename=filename))}" alt="{escape(alt)}"'
+                      f"{_attrs(extra)}>")
+
+    variants = entry["variants"]
+    original = variants[entry["format"]]
+    # fallback: a menor variante >= fallback_width (ou a maior existente)
+    src = next((p for w, p in original if w >= fallback_width), original[-1][1])
+    parts = ["<picture>"]
+    for fmt, mime in MODERN_FORMATS:
+        if variants.get(fmt):
+            parts.append(f'<source type="{mime}" srcset="{escape(_srcset(variants[fmt]))}" sizes="{escape(sizes)}">')
+    parts.append(
+        f'<img src="{escape(url_for("static", filename=src))}" srcset="{escape(_srcset(original))}" '
+        f'sizes="{escape(sizes)}" width="{entry["width"]}" height="{entry["height"]}" '
+        f'alt="{escape(alt)}"{_attrs(extra)}>'
+    )
+    parts.append("</picture>")
+    return Markup("".join(parts))
+
+
+def _attrs(attrs: dict) -> str:
+    return "".join(
+        f' {escape(k.replace("_", "-"))}="{escape(v)}"' for k, v in attrs.items() if v not in (None, False)
+    )
+
+
+@lru_cache(maxsize=256)
+def _exists(folder: str, filename: str) -> bool:
+    return os.path.isfile(os.path.join(folder, filename))
+
+
+def static_exists(filename: str) -> bool:
+    """Evita referenciar arquivos ausentes (cada um vira um 404 por visita)."""
+    return _exists(current_app.static_folder, filename)
+
+
+def init_static_assets(app) -> None:
+    manifest = load_manifest(app.static_folder)
+    images = load_manifest(app.static_folder, VARIANTS_DIR)
+    app.extensions["static_manifest"] = manifest
+    app.extensions["image_manifest"] = images
+    app.jinja_env.globals.update(picture=picture, static_exists=static_exists)
+    if manifest:
+        app.url_defaults(_static_url_defaults)
+    if manifest or images:
+        app.view_functions["static"] = static_view
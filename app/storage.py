@@ -0,0 +1,325 @@
+"""
+Armazenamento das imagens das categorias fora do banco.
+
+As chaves são endereçadas pelo conteúdo (sha256): o mesmo arquivo enviado
+duas vezes vira um único objeto, e um objeto nunca muda depois de escrito
+(cache immutable no CDN). Layout:
+
+    category/ab/<hash>.<ext>          original
+    category/ab/<hash>/<w>.<ext>      larguras do grid (geradas no upload)
+
+STORAGE_BACKEND:
+- db (padrão): blob na coluna featured_categories.image (comportamento antigo);
+- local: arquivos em STORAGE_LOCAL_DIR;
+- s3: bucket S3 ou compatível (STORAGE_S3_BUCKET, STORAGE_S3_ENDPOINT_URL,
+  credenciais padrão da AWS; `boto3` importado só no primeiro uso);
+- supabase: Supabase Storage (SUPABASE_BUCKET, cliente de extensions.get_supabase);
+- memory: dicionário em processo (testes/benchmark).
+
+Com STORAGE_PUBLIC_URL (CDN ou bucket público) as URLs do grid apontam
+direto para o storage; sem ela, /uploads/category/<id> lê do storage.
+scripts/migrate_images_to_storage.py move os blobs já gravados no banco.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Any
+
+from flask import current_app
+
+from .images import content_hash, render_variant, sniff_format, sniff_mime
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+BACKENDS = ("db", "local", "s3", "supabase", "memory")
+_EXT = {"jpeg": "jpg"}
+
+
+def original_key(image_hash: str, fmt: str) -> str:
+    return f"category/{image_hash[:2]}/{image_hash}.{_EXT.get(fmt, fmt)}"
+
+
+def variant_key(image_hash: str, width: int, fmt: str) -> str:
+    return f"category/{image_hash[:2]}/{image_hash}/{width}.{_EXT.get(fmt, fmt)}"
+
+
+class BlobStore(ABC):
+    name = "base"
+
+    def __init__(self, public_url: str | None = None):
+        self.public_url = (public_url or "").rstrip("/") or None
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> None: ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    def put_if_absent(self, key: str, data: bytes, content_type: str) -> bool:
+        """Deduplica: grava só se a chave (= conteúdo) ainda não existe."""
+        if self.exists(key):
+            return False
+        self.put(key, data, content_type)
+        return True
+
+    def url(self, key: str) -> str | None:
+        """URL pública (CDN/bucket) ou None: o app serve o arquivo."""
+        return f"{self.public_url}/{key}" if self.public_url else None
+
+
+class MemoryStore(BlobStore):
+    name = "memory"
+
+    def __init__(self, public_url: str | None = None):
+        super().__init__(public_url)
+        self._objects: dict[str, tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, data, content_type):
+        with self._lock:
+            self._objects[key] = (bytes(data), content_type)
+
+    def get(self, key):
+        obj = self._objects.get(key)
+        return obj[0] if obj else None
+
+    def exists(self, key):
+        return key in self._objects
+
+    def delete(self, key):
+        with self._lock:
+            self._objects.pop(key, None)
+
+
+class LocalStore(BlobStore):
+    name = "local"
+
+    def __init__(self, root: str, public_url: str | None = None):
+        super().__init__(public_url)
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"chave fora do diretório do storage: {key!r}")
+        return path
+
+    def put(self, key, data, content_type):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # escrita atômica: leitores nunca veem arquivo pela metade
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+
+class S3Store(BlobStore):
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: str | None = None, region: str | None = None,
+                 public_url: str | None = None):
+        super().__init__(public_url)
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # boto3 é opcional e pesado: só no primeiro acesso ao storage
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+
+                    self._client = boto3.client(
+                        "s3", endpoint_url=self.endpoint_url, region_name=self.region
+                    )
+        return self._client
+
+    def put(self, key, data, content_type):
+        self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=data, ContentType=content_type, CacheControl=IMMUTABLE
+        )
+
+    def get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class SupabaseStore(BlobStore):
+    name = "supabase"
+
+    def __init__(self, bucket: str, public_url: str | None = None):
+        super().__init__(public_url)
+        self.bucket = bucket
+
+    @property
+    def _bucket(self):
+        from .extensions import get_supabase
+
+        client = get_supabase()
+        if client is None:
+            raise RuntimeError("SUPABASE_URL/SUPABASE_SERVICE_ROLE_KEY não definidos")
+        return client.storage.from_(self.bucket)
+
+    def put(self, key, data, content_type):
+        self._bucket.upload(
+            key, data, {"content-type": content_type, "cache-control": "31536000", "upsert": "true"}
+        )
+
+    def get(self, key):
+        try:
+            return self._bucket.download(key)
+        except Exception:
+            return None
+
+    def exists(self, key):
+        folder, _, name = key.rpartition("/")
+        return any(obj.get("name") == name for obj in self._bucket.list(folder, {"search": name}))
+
+    def delete(self, key):
+        self._bucket.remove([key])
+
+    def url(self, key):
+        if self.public_url:
+            return super().url(key)
+        # bucket público: URL do próprio Supabase Storage
+        if os.getenv("SUPABASE_BUCKET_PUBLIC") == "1" and os.getenv("SUPABASE_URL"):
+            return f"{os.getenv('SUPABASE_URL').rstrip('/')}/storage/v1/object/public/{self.bucket}/{key}"
+        return None
+
+
+def create_store(config) -> BlobStore | None:
+    backend = (config.get("STORAGE_BACKEND") or "db").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND inválido: {backend!r} (use {', '.join(BACKENDS)})")
+    public_url = config.get("STORAGE_PUBLIC_URL")
+    if backend == "db":
+        return None
+    if backend == "memory":
+        return MemoryStore(public_url)
+    if backend == "local":
+        return LocalStore(config["STORAGE_LOCAL_DIR"], public_url)
+    if backend == "s3":
+        return S3Store(
+            config["STORAGE_S3_BUCKET"],
+            endpoint_url=config.get("STORAGE_S3_ENDPOINT_URL"),
+            region=config.get("STORAGE_S3_REGION"),
+            public_url=public_url,
+        )
+    return SupabaseStore(config["SUPABASE_BUCKET"], public_url)
+
+
+def get_store() -> BlobStore | None:
+    """Backend configurado, ou None quando as imagens ficam no banco."""
+    return current_app.extensions.get("storage")
+
+
+# ---------- imagens das categorias ----------
+def store_image(store: BlobStore, data: bytes, widths=()) -> dict[str, Any]:
+    """
+    Grava original + larguras `widths` (formato do original) e devolve os
+    campos para a categoria. Conteúdo já existente não é reenviado; cada
+    largura ausente é gerada mesmo que o original já exista (tentativa
+    anterior interrompida), porque o grid aponta para todas elas.
+    """
+    image_hash = content_hash(data)
+    fmt = sniff_format(data) or "jpeg"
+    key = original_key(image_hash, fmt)
+    store.put_if_absent(key, data, sniff_mime(data))
+    if fmt != "gif":
+        for w in widths:
+            vkey = variant_key(image_hash, w, fmt)
+            if store.exists(vkey):
+                continue
+            try:
+                body = render_variant(data, w, fmt, fmt)
+            except Exception as e:
+                # arquivo que o Pillow não abre: a largura vira cópia do original
+                current_app.logger.warning(f"variante {w}px de {key} falhou: {e}")
+                body = data
+            store.put(vkey, body, sniff_mime(body))
+    return {
+        "image_key": key,
+        "image_hash": image_hash,
+        "image_mime": sniff_mime(data),
+        "image_size": len(data),
+    }
+
+
+def save_category_image(c, data: bytes, widths=()) -> None:
+    """Imagem nova da categoria: no storage configurado ou, sem ele, no banco."""
+    store = get_store()
+    if store is None:
+        c.set_image(data)
+        c.image_key = None
+        return
+    for field, value in store_image(store, data, widths).items():
+        setattr(c, field, value)
+    c.image = None
+    c.image_url = None
+
+
+def load_category_image(image_key: str | None) -> bytes | None:
+    store = get_store()
+    if not image_key or store is None:
+        return None
+    return store.get(image_key)
+
+
+def init_storage(app) -> None:
+    if not app.config.get("STORAGE_LOCAL_DIR"):
+        app.config["STORAGE_LOCAL_DIR"] = os.path.join(
+            app.config.get("UPLOAD_DIR") or tempfile.gettempdir(), "blobs"
+        )
+    app.extensions["storage"] = create_store(app.config)
@@ -0,0 +1,137 @@
+"""
+Upload das imagens do admin: streaming, limites e normalização.
+
+- MAX_CONTENT_LENGTH: o Werkzeug corta o corpo (413) durante o parse, antes
+  de a view rodar;
+- UploadRequest: cada arquivo do multipart é gravado em pedaços num
+  SpooledTemporaryFile (memória até UPLOAD_SPOOL_BYTES, depois disco em
+  UPLOAD_DIR), nunca num bytes inteiro;
+- read_upload: extensão (ALLOWED_IMG_EXTS), tamanho (UPLOAD_MAX_BYTES) e
+  magic bytes, sem ler o arquivo todo;
+- normalização (images.normalize_image: sem EXIF, maior lado <=
+  IMAGE_MAX_SIDE, re-encode) num pool de UPLOAD_WORKERS threads: limita
+  quantas fotos decodificadas cabem na memória do worker ao mesmo tempo,
+  qualquer que seja o número de threads do gunicorn.
+"""
+from __future__ import annotations
+
+import os
+import pathlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from flask import Request, current_app
+
+from .images import normalize_image, sniff_format
+
+CHUNK = 64 * 1024
+ALLOWED_IMG_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+UPLOAD_FORMATS = {"jpeg", "png", "webp", "gif"}
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+class UploadError(ValueError):
+    """Upload recusado; a mensagem vai para o flash do admin."""
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        cfg = current_app.config
+        return SpooledTemporaryFile(
+            max_size=cfg.get("UPLOAD_SPOOL_BYTES", 1024 * 1024),
+            dir=cfg.get("UPLOAD_DIR") or None,
+        )
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1048576:.0f} MB"
+
+
+def _spool(stream, max_bytes: int) -> SpooledTemporaryFile:
+    """Copia em pedaços um stream não posicionável, respeitando o limite."""
+    cfg = current_app.config
+    spool = SpooledTemporaryFile(
+        max_size=cfg.get("UPLOAD_SPOOL_BYTES", 1024 * 1024), dir=cfg.get("UPLOAD_DIR") or None
+    )
+    total = 0
+    while True:
+        chunk = stream.read(CHUNK)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            spool.close()
+            raise UploadError(f"arquivo maior que {_mb(max_bytes)}")
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def read_upload(file_storage) -> tuple[object, str]:
+    """
+    Valida o upload sem lê-lo inteiro e devolve (arquivo posicionado no
+    início, formato pelos magic bytes). UploadError se recusado.
+    """
+    max_bytes = current_app.config.get("UPLOAD_MAX_BYTES", 20 * 1024 * 1024)
+    ext = pathlib.Path(file_storage.filename or "").suffix.lower()
+    if ext and ext not in ALLOWED_IMG_EXTS:
+        raise UploadError(f"extensão não permitida: {ext}")
+
+    stream = file_storage.stream
+    if stream.seekable():
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        if size > max_bytes:
+            raise UploadError(f"arquivo maior que {_mb(max_bytes)}")
+    else:
+        stream = _spool(stream, max_bytes)
+
+    head = stream.read(16)
+    stream.seek(0)
+    if not head:
+        raise UploadError("arquivo vazio")
+    fmt = sniff_format(head)
+    if fmt not in UPLOAD_FORMATS:
+        raise UploadError("formato não suportado (use JPEG, PNG, WebP ou GIF)")
+    return stream, fmt
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("UPLOAD_WORKERS", 2),
+                    thread_name_prefix="upload",
+                )
+    return _executor
+
+
+def process_upload(file_storage) -> bytes:
+    """Imagem validada e normalizada, pronta para save_category_image."""
+    stream, fmt = read_upload(file_storage)
+    cfg = current_app.config
+    future = _pool().submit(
+        normalize_image,
+        stream,
+        fmt,
+        cfg.get("IMAGE_MAX_SIDE", 1920),
+        cfg.get("IMAGE_MAX_PIXELS", 50_000_000),
+    )
+    try:
+        return future.result()
+    except ValueError as e:
+        raise UploadError(str(e)) from e
+    finally:
+        if stream is not file_storage.stream:
+            stream.close()
+        file_storage.close()
+
+
+def init_uploads(app) -> None:
+    app.request_class = UploadRequest
@@ -0,0 +1,33 @@
+# gunicorn.conf.py — lido automaticamente pelo gunicorn (ver Dockerfile)
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# o pool do SQLAlchemy é dimensionado por GUNICORN_THREADS (app/db_engine.py)
+os.environ.setdefault("GUNICORN_THREADS", str(threads))
+
+
+def post_worker_init(worker):
+    # abre conexões antes da primeira requisição do worker
+    from app.db_engine import prewarm_pool
+    from app.extensions import db
+
+    n = prewarm_pool(worker.wsgi, db)
+    worker.log.info(f"pool do banco pré-aquecido com {n} conexão(ões)")
+
+    # fila de ingestão deixada por um worker anterior: começa a descarregar
+    flusher = worker.wsgi.extensions.get("ingest")
+    if flusher is not None:
+        flusher.ensure_started()
+        flusher.notify()
+
+
+def worker_exit(server, worker):
+    # INGEST_MODE=queue: tenta descarregar a fila local antes de sair
+    # (o que sobrar fica no arquivo e outro worker/boot reenvia)
+    flusher = worker.wsgi.extensions.get("ingest")
+    if flusher is not None:
+        n = flusher.drain(timeout=5.0)
+        worker.log.info(f"ingestão: {n} linha(s) descarregada(s) na saída do worker")
@@ -0,0 +1,390 @@
+# scripts/bench.py
+"""
+Benchmark dos endpoints públicos e do admin:
+
+    python scripts/bench_seed.py                       # uma vez: banco em .bench/bench.db
+    python scripts/bench.py [--mode client|gunicorn|both] [--requests 300] \
+        [--concurrency 8] [--workers 2] [--threads 4] [--only home,faq]
+    python scripts/bench.py --save-baseline            # grava/mescla .bench/baseline.json
+    python scripts/bench.py --tolerance 0.15           # compara com a baseline (sai 1 se regredir)
+
+Cenários: / , /faq, /api/locations, POST /api/quote, /uploads/category/<id>
+(imagens de ~1 MB) e /admin/crm. Modo "client" usa o cliente de teste do
+Flask no próprio processo (sequencial: mede o custo da aplicação); modo
+"gunicorn" sobe o gunicorn.conf.py real numa porta local e dispara
+--concurrency conexões keep-alive. Relata RPS, p50/p95/p99, erros e a
+memória (RSS) do processo / de cada worker. Regressão: RPS abaixo de
+(1 - tolerância) ou p95 acima de (1 + tolerância) x baseline. Cenários sem
+entrada na baseline são listados; se nenhum tiver (ou com --strict, se
+algum faltar), sai com 1; sem baseline legível, sai com 2.
+"""
+import argparse
+import base64
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench_seed import BENCH_DIR, CATEGORIES, DEFAULT_URL, PLACES  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+# p95 abaixo disso (ms) não conta como regressão: ruído de medição
+MIN_P95_DELTA_MS = 1.0
+
+
+# ---------- cenários ----------
+def _quote_body(rng: random.Random) -> bytes:
+    day = 1 + rng.randint(0, 27)
+    return json.dumps({
+        "pickup_place": rng.choice(PLACES),
+        "pickup_date": f"2026-11-{day:02d}",
+        "drop_place": rng.choice(PLACES),
+        "drop_date": f"2026-12-{day:02d}",
+        "name": "Bench",
+        "phone": f"+1 407 {rng.randint(10**6, 10**7 - 1)}",
+        "category": rng.choice(CATEGORIES),
+        "source": "bench",
+    }).encode()
+
+
+def scenarios(category_ids: list[int]) -> list[dict]:
+    ids = category_ids or [0]
+    return [
+        {"name": "home", "method": "GET", "path": lambda i, rng: "/"},
+        {"name": "faq", "method": "GET", "path": lambda i, rng: "/faq"},
+        {"name": "api_locations", "method": "GET", "path": lambda i, rng: "/api/locations"},
+        {"name": "api_quote", "method": "POST", "path": lambda i, rng: "/api/quote",
+         "body": _quote_body, "content_type": "application/json"},
+        {"name": "category_image", "method": "GET",
+         "path": lambda i, rng: f"/uploads/category/{ids[i % len(ids)]}"},
+        {"name": "admin_crm", "method": "GET", "path": lambda i, rng: "/admin/crm", "auth": True},
+    ]
+
+
+# ---------- medições ----------
+def rss_mb(pid: int | str = "self") -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid == "self":
+        import resource
+
+        # pico (Linux em KB, macOS em bytes)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return None
+
+
+def child_pids(parent: int) -> list[int]:
+    pids = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # campo 4 = ppid (o nome do processo, entre parênteses, pode ter espaços)
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def summarize(name: str, latencies: list[float], wall: float, errors: int) -> dict:
+    lat = sorted(latencies)
+
+    def pct(p: float) -> float:
+        if not lat:
+            return 0.0
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2)
+
+    return {
+        "name": name,
+        "requests": len(lat),
+        "errors": errors,
+        "rps": round(len(lat) / wall, 1) if wall else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+# ---------- modo client (Flask test client) ----------
+def run_client(scens: list[dict], n: int, warmup: int, auth: dict) -> list[dict]:
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    results = []
+    for sc in scens:
+        rng = random.Random(1)
+        headers = auth if sc.get("auth") else {}
+
+        def call(i):
+            resp = client.open(
+                sc["path"](i, rng), method=sc["method"], headers=headers,
+                data=sc["body"](rng) if sc.get("body") else None,
+                content_type=sc.get("content_type"),
+            )
+            resp.get_data()
+            resp.close()
+            return resp.status_code
+
+        for i in range(warmup):
+            call(i)
+        latencies, errors = [], 0
+        t0 = time.perf_counter()
+        for i in range(n):
+            t = time.perf_counter()
+            if call(i) >= 400:
+                errors += 1
+            latencies.append(time.perf_counter() - t)
+        result = summarize(sc["name"], latencies, time.perf_counter() - t0, errors)
+        result["rss_mb"] = rss_mb()
+        results.append(result)
+        _print_row("client", result)
+    return results
+
+
+# ---------- modo gunicorn ----------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(port: int, workers: int, threads: int, env: dict) -> subprocess.Popen:
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    log_path = os.path.join(BENCH_DIR, "gunicorn.log")
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+            cwd=REPO_ROOT,
+            env=dict(env, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS=str(workers),
+                     GUNICORN_THREADS=str(threads)),
+            stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                raise RuntimeError("gunicorn saiu:\n" + f.read()[-2000:])
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                # espera todos os workers subirem
+                while len(child_pids(proc.pid)) < workers and time.monotonic() < deadline:
+                    time.sleep(0.1)
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("gunicorn não respondeu em 30s")
+
+
+def run_gunicorn(scens: list[dict], n: int, warmup: int, auth: dict, concurrency: int,
+                 workers: int, threads: int) -> list[dict]:
+    port = _free_port()
+    proc = start_gunicorn(port, workers, threads, os.environ.copy())
+    results = []
+    try:
+        for sc in scens:
+            headers = dict(auth if sc.get("auth") else {})
+            if sc.get("content_type"):
+                headers["Content-Type"] = sc["content_type"]
+            counter = itertools.count()
+            lock = threading.Lock()
+            latencies: list[float] = []
+            errors = [0]
+            total = warmup + n
+
+            def worker():
+                rng = random.Random(threading.get_ident())
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                local, bad = [], 0
+                while True:
+                    with lock:
+                        i = next(counter)
+                    if i >= total:
+                        break
+                    body = sc["body"](rng) if sc.get("body") else None
+                    t = time.perf_counter()
+                    try:
+                        conn.request(sc["method"], sc["path"](i, rng), body=body, headers=headers)
+                        resp = conn.getresponse()
+                        resp.read()
+                        status = resp.status
+                    except (OSError, http.client.HTTPException):
+                        conn.close()
+                        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                        status = 599
+                    if i >= warmup:
+                        local.append(time.perf_counter() - t)
+                        bad += status >= 400
+                conn.close()
+                with lock:
+                    latencies.extend(local)
+                    errors[0] += bad
+
+            t0 = time.perf_counter()
+            pool = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            # o aquecimento entra no relógio; desconta pela fração de requisições
+            wall = (time.perf_counter() - t0) * n / total
+            result = summarize(sc["name"], latencies, wall, errors[0])
+            worker_rss = [r for r in (rss_mb(pid) for pid in child_pids(proc.pid)) if r is not None]
+            result["rss_mb"] = max(worker_rss) if worker_rss else None
+            result["rss_mb_workers"] = worker_rss
+            results.append(result)
+            _print_row("gunicorn", result)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return results
+
+
+# ---------- relatório / baseline ----------
+def _print_row(mode: str, r: dict) -> None:
+    print(f"{mode:<9} {r['name']:<16} {r['requests']:>6} {r['rps']:>9.1f} {r['p50_ms']:>8.2f} "
+          f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>5} {r['rss_mb'] or 0:>8.1f}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> tuple[list[str], list[str]]:
+    """(regressões, chaves medidas que não existem na baseline)."""
+    regressions, missing = [], []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if not base:
+            missing.append(key)
+            continue
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{key}: RPS {cur['rps']} < {base['rps']} (baseline)")
+        if (cur["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+                and cur["p95_ms"] - base["p95_ms"] > MIN_P95_DELTA_MS):
+            regressions.append(f"{key}: p95 {cur['p95_ms']} ms > {base['p95_ms']} ms (baseline)")
+    return regressions, missing
+
+
+def _load_baseline(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _category_ids() -> list[int]:
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.connect() as conn:
+        ids = conn.execute(text(
+            "SELECT id FROM featured_categories WHERE image_hash IS NOT NULL ORDER BY id"
+        )).scalars().all()
+    engine.dispose()
+    return list(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL", DEFAULT_URL))
+    parser.add_argument("--mode", choices=("client", "gunicorn", "both"), default="both")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--only", default="", help="cenários separados por vírgula")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="mescla os resultados na baseline")
+    parser.add_argument("--strict", action="store_true",
+                        help="falha se algum cenário medido não estiver na baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    # o mesmo ambiente vale para o app em processo e para o gunicorn
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("PAGE_CACHE_BACKEND", "memory")
+    from app.config import Config
+
+    user = os.environ.get("ADMIN_USERNAME", Config.ADMIN_USERNAME)
+    password = os.environ.get("ADMIN_PASSWORD", Config.ADMIN_PASSWORD)
+    auth = {"Authorization": "Basic " + base64.b64encode(f"{user}:{password}".encode()).decode()}
+
+    scens = scenarios(_category_ids())
+    if args.only:
+        wanted = set(args.only.split(","))
+        scens = [s for s in scens if s["name"] in wanted]
+
+    print(f"[bench] {args.database_url} | {args.requests} req/cenário | "
+          f"concorrência {args.concurrency} | {args.workers}x{args.threads} (gunicorn)")
+    print(f"{'modo':<9} {'cenário':<16} {'req':>6} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'erros':>5} {'rss MB':>8}")
+    results = {}
+    if args.mode in ("client", "both"):
+        for r in run_client(scens, args.requests, args.warmup, auth):
+            results[f"client:{r['name']}"] = r
+    if args.mode in ("gunicorn", "both"):
+        for r in run_gunicorn(scens, args.requests, args.warmup, auth, args.concurrency,
+                              args.workers, args.threads):
+            results[f"gunicorn:{r['name']}"] = r
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        # mescla: um --only/--mode parcial atualiza só as próprias entradas
+        merged = dict(_load_baseline(args.baseline) or {}, **results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print(f"[bench] baseline gravada em {args.baseline} ({len(results)} de {len(merged)} entradas)")
+        return
+
+    baseline = _load_baseline(args.baseline)
+    if baseline is None:
+        print(f"[bench] sem baseline legível em {args.baseline} (use --save-baseline)")
+        sys.exit(2)
+    regressions, missing = compare(results, baseline, args.tolerance)
+    if missing:
+        print(f"\n[bench] sem baseline, não comparados: {', '.join(missing)}")
+    if len(missing) == len(results):
+        print("[bench] FALHOU: nenhum cenário medido existe na baseline")
+        sys.exit(1)
+    if missing and args.strict:
+        print("[bench] FALHOU: --strict exige baseline para todos os cenários")
+        sys.exit(1)
+    if regressions:
+        print(f"\n[bench] REGRESSÃO (tolerância {args.tolerance:.0%}):")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print(f"\n[bench] dentro da baseline (tolerância {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# scripts/bench_seed.py
+"""
+Popula um banco descartável com volumes realistas para o benchmark
+(scripts/bench.py):
+
+    python scripts/bench_seed.py [--database-url sqlite:///.bench/bench.db] \
+        [--categories 200] [--image-kb 1024] [--quotes 100000] \
+        [--locations 5000] [--faqs 2000] [--force]
+
+Cria o schema (migrations.upgrade) e insere categorias com imagens JPEG de
+~image-kb cada (conteúdo distinto, hash distinto), cotações espalhadas nos
+últimos 18 meses, localidades e perguntas do FAQ. Sem --force, não mexe num
+banco que já tem cotações. Nunca aponte para o banco de produção.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+BENCH_DIR = os.path.join(REPO_ROOT, ".bench")
+DEFAULT_URL = "sqlite:///" + os.path.join(BENCH_DIR, "bench.db")
+BATCH = 5000
+
+PLACES = (
+    "Aeroporto MCO", "Aeroporto MIA", "Aeroporto FLL", "Aeroporto TPA", "Hotel em Orlando",
+    "International Drive", "Kissimmee", "Disney Springs", "Miami Beach", "Downtown Miami",
+    "Fort Lauderdale", "Porto de Miami", "Port Canaveral", "Universal Orlando", "Lake Buena Vista",
+)
+CITIES = ("Orlando", "Miami", "Tampa", "Kissimmee", "Fort Lauderdale", "Naples", "Sarasota", "Key West")
+KINDS = ("Aeroporto", "Hotel", "Resort", "Shopping", "Estação", "Porto", "Centro", "Praia")
+CATEGORIES = ("Econômico", "Sedan", "SUVs", "Minivan", "Especial", "Conversível", "Pickup", "Luxo")
+SOURCES = ("home", "hero", "frota", "whatsapp", "faq")
+STATUSES = (("novo", 60), ("em_contato", 25), ("concluido", 15))
+WORDS = (
+    "reserva caução cartão crédito devolução tanque cheio seguro cobertura franquia motorista "
+    "adicional habilitação internacional passaporte idade mínima cadeirinha pedágio SunPass "
+    "quilometragem livre cancelamento reembolso atraso voo entrega retirada aeroporto hotel "
+    "pagamento parcelado dólar câmbio taxa limpeza multa estacionamento GPS upgrade categoria"
+).split()
+
+
+def _jpeg_base(kb: int) -> tuple[bytes, int]:
+    """Ruído em JPEG com ~kb KB (ruído quase não comprime)."""
+    from PIL import Image
+
+    side = max(64, int((kb * 1024 / 2.4) ** 0.5))
+    im = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    buf = io.BytesIO()
+    im.save(buf, "JPEG", quality=90)
+    return buf.getvalue(), side
+
+
+def seed_categories(db, n: int, image_kb: int, log) -> None:
+    from app.models import FeaturedCategory
+
+    if not n:
+        return
+    base, _ = _jpeg_base(image_kb) if image_kb else (b"", 0)
+    for i in range(n):
+        c = FeaturedCategory(
+            name=f"{CATEGORIES[i % len(CATEGORIES)]} {i}",
+            slug=f"bench-{i}",
+            active=True,
+            position=i,
+        )
+        if base:
+            # comentário JPEG (COM) com o índice: mesmo peso, hash diferente
+            marker = f"bench-{i}".encode()
+            c.set_image(base[:2] + b"\xff\xfe" + (len(marker) + 2).to_bytes(2, "big") + marker + base[2:])
+        db.session.add(c)
+        if i % 20 == 19:
+            db.session.commit()
+    db.session.commit()
+    log(f"  {n} categorias ({image_kb} KB por imagem)")
+
+
+def seed_quotes(db, n: int, rng: random.Random, log) -> None:
+    from app.models import QuoteRequest
+
+    now = datetime.utcnow()
+    statuses = [s for s, w in STATUSES for _ in range(w)]
+    table = QuoteRequest.__table__
+    done = 0
+    while done < n:
+        rows = []
+        for _ in range(min(BATCH, n - done)):
+            created = now - timedelta(minutes=rng.randint(0, 540 * 24 * 60))
+            pickup = (created + timedelta(days=rng.choice((0, 1, 2, 5, 7, 10, 14, 21, 30, 45, 60, 90)))).date()
+            drop = pickup + timedelta(days=rng.randint(2, 21))
+            rows.append({
+                "created_at": created,
+                "pickup_place": rng.choice(PLACES),
+                "pickup_date": pickup.isoformat(),
+                "drop_place": rng.choice(PLACES),
+                "drop_date": drop.isoformat(),
+                "pickup_on": pickup,
+                "drop_on": drop,
+                "name": f"Cliente {rng.randint(1, 10**6)}",
+                "phone": f"+55 11 9{rng.randint(10**7, 10**8 - 1)}",
+                "category": rng.choice(CATEGORIES),
+                "source": rng.choice(SOURCES),
+                "user_agent": "bench",
+                "ip_addr": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                "status": rng.choice(statuses),
+            })
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+        done += len(rows)
+    log(f"  {n} cotações")
+
+
+def seed_locations(db, n: int, log) -> None:
+    from app.models import Location
+
+    rows = [{"name": f"{KINDS[i % len(KINDS)]} {CITIES[(i // len(KINDS)) % len(CITIES)]} {i}",
+             "active": True, "position": i} for i in range(n)]
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(Location.__table__.insert(), rows[i:i + BATCH])
+    db.session.commit()
+    log(f"  {n} localidades")
+
+
+def seed_faqs(db, n: int, rng: random.Random, log) -> None:
+    from app.faq import search_text
+    from app.models import FaqItem
+
+    rows = []
+    for i in range(n):
+        question = "Como funciona " + " ".join(rng.sample(WORDS, 4)) + "?"
+        answer = "<p>" + " ".join(rng.choices(WORDS, k=rng.randint(30, 120))) + ".</p>"
+        rows.append({"question": question, "answer": answer, "position": i, "active": True,
+                     "search_text": search_text(question, answer)})
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(FaqItem.__table__.insert(), rows[i:i + BATCH])
+    db.session.commit()
+    log(f"  {n} perguntas do FAQ")
+
+
+def seed(database_url: str, categories: int, image_kb: int, quotes: int, locations: int,
+         faqs: int, force: bool = False, log=print) -> bool:
+    """Retorna False se o banco já tinha dados (e não houve --force)."""
+    if database_url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(os.path.abspath(database_url[len("sqlite:///"):])), exist_ok=True)
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("METRICS_ENABLED", "0")
+
+    from sqlalchemy import func, select, text
+
+    from app import create_app
+    from app.analytics import refresh_rollups
+    from app.cache import invalidate
+    from app.extensions import db
+    from app.migrations import upgrade
+    from app.models import QuoteRequest
+
+    app = create_app()
+    with app.app_context():
+        upgrade(log=lambda *_: None)
+        if db.session.execute(select(func.count()).select_from(QuoteRequest)).scalar():
+            if not force:
+                log("[bench_seed] banco já populado (use --force para recriar)")
+                return False
+            for table in ("quote_requests", "quote_daily_rollups", "rollup_watermarks", "featured_items",
+                          "featured_categories", "locations", "faq_items"):
+                db.session.execute(text(f"DELETE FROM {table}"))
+            db.session.commit()
+
+        t0 = time.perf_counter()
+        rng = random.Random(42)
+        log(f"[bench_seed] populando {database_url}")
+        seed_categories(db, categories, image_kb, log)
+        seed_quotes(db, quotes, rng, log)
+        seed_locations(db, locations, log)
+        seed_faqs(db, faqs, rng, log)
+        refresh_rollups(full=True)
+        for ns in ("categories", "locations", "faq"):
+            invalidate(ns)
+        log(f"[bench_seed] pronto em {time.perf_counter() - t0:.1f}s")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=DEFAULT_URL)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--image-kb", type=int, default=1024)
+    parser.add_argument("--quotes", type=int, default=100_000)
+    parser.add_argument("--locations", type=int, default=5000)
+    parser.add_argument("--faqs", type=int, default=2000)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    seed(args.database_url, args.categories, args.image_kb, args.quotes, args.locations,
+         args.faqs, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# scripts/build_images.py
+"""
+Pipeline das imagens estáticas (ver app/static_assets.py):
+
+    python scripts/build_images.py            # gera variantes + manifest + relatório
+    python scripts/build_images.py --check    # só o relatório de referências (sai 1 se faltar arquivo)
+
+Para cada JPEG/PNG de app/static/assets: larguras de IMAGE_WIDTHS até a
+largura original, em AVIF (se o Pillow suportar), WebP e no formato
+original, em app/static/variants/ com o hash do conteúdo no nome.
+Grava variants/manifest.json (lido pelo helper `picture()`), mostra a
+economia de bytes e lista arquivos referenciados nos templates que não
+existem (404 a cada visita) e arquivos grandes que ninguém referencia.
+Rode antes de scripts/build_static.py.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from app.images import IMAGE_WIDTHS, can_encode, render_variant, sniff_format  # noqa: E402
+from app.static_assets import MANIFEST, VARIANTS_DIR  # noqa: E402
+
+STATIC = os.path.join(REPO_ROOT, "app", "static")
+TEMPLATES = os.path.join(REPO_ROOT, "app", "templates")
+SOURCE_DIRS = ("assets",)
+EXT_BY_FORMAT = {"jpeg": "jpg", "png": "png", "webp": "webp", "avif": "avif"}
+
+# referências a estáticos nos templates
+_REF_PATTERNS = (
+    re.compile(r"""url_for\(\s*['"]static['"]\s*,\s*filename\s*=\s*['"]([^'"]+)['"]"""),
+    re.compile(r"""picture\(\s*['"]([^'"]+)['"]"""),
+    re.compile(r"""static_exists\(\s*['"]([^'"]+)['"]"""),
+    re.compile(r"""["'(]/static/([^"')?#]+)"""),
+)
+
+
+def _widths(original_width: int) -> list[int]:
+    widths = [w for w in IMAGE_WIDTHS if w < original_width]
+    widths.append(min(original_width, IMAGE_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def build(report) -> dict:
+    from PIL import Image
+
+    out_root = os.path.join(STATIC, VARIANTS_DIR)
+    tmp_root = out_root + ".tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+    formats = [f for f in ("avif", "webp") if can_encode(f)]
+    manifest = {}
+
+    for subdir in SOURCE_DIRS:
+        for src in sorted(glob.glob(os.path.join(STATIC, subdir, "**", "*"), recursive=True)):
+            if not os.path.isfile(src):
+                continue
+            with open(src, "rb") as f:
+                data = f.read()
+            original = sniff_format(data)
+            if original not in ("jpeg", "png"):
+                continue
+            rel = os.path.relpath(src, STATIC).replace(os.sep, "/")
+            stem = os.path.splitext(rel)[0]
+            digest = hashlib.sha256(data).hexdigest()[:10]
+            with Image.open(src) as im:
+                width, height = im.size
+                has_alpha = im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info
+            # fallback (<img>): JPEG para imagens sem transparência, mesmo que o
+            # arquivo seja PNG (ex.: foto salva como PNG com extensão .jpg)
+            fallback = "png" if has_alpha else "jpeg"
+            ext_format = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png"}.get(rel.rsplit(".", 1)[-1].lower())
+            if ext_format != original:
+                print(f"  aviso: {rel} é {original.upper()} com outra extensão (fallback em {fallback.upper()})")
+
+            variants = {}
+            for fmt in formats + [fallback]:
+                variants[fmt] = []
+                for w in _widths(width):
+                    out = render_variant(data, w if w < width else None, fmt, original)
+                    path = f"{VARIANTS_DIR}/{stem}.{digest}.{w}.{EXT_BY_FORMAT[fmt]}"
+                    full = os.path.join(tmp_root, os.path.relpath(path, VARIANTS_DIR))
+                    os.makedirs(os.path.dirname(full), exist_ok=True)
+                    with open(full, "wb") as f:
+                        f.write(out)
+                    variants[fmt].append([w, path, len(out)])
+
+            manifest[rel] = {
+                "width": width,
+                "height": height,
+                "format": fallback,
+                "bytes": len(data),
+                "variants": variants,
+            }
+            report(rel, manifest[rel])
+
+    # o manifest não leva os tamanhos (só o relatório usa)
+    public = {
+        rel: dict(e, variants={f: [[w, p] for w, p, _ in v] for f, v in e["variants"].items()})
+        for rel, e in manifest.items()
+    }
+    with open(os.path.join(tmp_root, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(public, f, indent=2, sort_keys=True)
+    shutil.rmtree(out_root, ignore_errors=True)
+    os.replace(tmp_root, out_root)
+    return manifest
+
+
+def _report_image(rel: str, entry: dict) -> None:
+    orig = entry["bytes"]
+    line = [f"  {rel} ({entry['width']}x{entry['height']}, {orig / 1024:.0f} KB)"]
+    for fmt, items in entry["variants"].items():
+        # o que um desktop comum baixa: a variante de ~960px
+        w, _, size = next((i for i in items if i[0] >= 960), items[-1])
+        line.append(f"{fmt}@{w}: {size / 1024:.0f} KB ({100 - size * 100 / orig:.0f}% menor)")
+    print(" | ".join(line))
+
+
+def scan_references() -> tuple[dict[str, set[str]], list[str]]:
+    """(arquivo referenciado -> templates que o usam, arquivos ausentes)."""
+    refs: dict[str, set[str]] = {}
+    for tpl in sorted(glob.glob(os.path.join(TEMPLATES, "*.html"))):
+        name = os.path.basename(tpl)
+        if "backup" in name or name.endswith(".bak"):
+            continue
+        with open(tpl, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        for pattern in _REF_PATTERNS:
+            for ref in pattern.findall(text):
+                refs.setdefault(ref, set()).add(name)
+    missing = sorted(r for r in refs if not os.path.isfile(os.path.join(STATIC, r)))
+    return refs, missing
+
+
+def guarded_references() -> set[str]:
+    """Arquivos usados só atrás de {% if static_exists(...) %} (opcionais)."""
+    guarded = set()
+    for tpl in glob.glob(os.path.join(TEMPLATES, "*.html")):
+        with open(tpl, encoding="utf-8", errors="replace") as f:
+            guarded.update(_REF_PATTERNS[2].findall(f.read()))
+    return guarded
+
+
+def main():
+    check_only = "--check" in sys.argv
+    if not check_only:
+        print(f"[build_images] formatos: {', '.join(f for f in ('avif', 'webp') if can_encode(f))} + JPEG/PNG")
+        manifest = build(_report_image)
+        total = sum(e["bytes"] for e in manifest.values())
+        best = 0
+        for e in manifest.values():
+            sizes = [next((i for i in items if i[0] >= 960), items[-1])[2] for items in e["variants"].values()]
+            best += min(sizes)
+        print(f"[build_images] {len(manifest)} imagem(ns): {total / 1024:.0f} KB originais -> "
+              f"{best / 1024:.0f} KB na melhor variante ~960px ({100 - best * 100 / max(total, 1):.0f}% menor)")
+
+    refs, missing = scan_references()
+    guarded = guarded_references()
+    for ref in list(missing):
+        where = ", ".join(sorted(refs[ref]))
+        if ref in guarded:
+            print(f"[build_images] opcional ausente: {ref} ({where}; protegido por static_exists)")
+            missing.remove(ref)
+        else:
+            print(f"[build_images] AUSENTE: {ref} (referenciado em {where})")
+    for src in sorted(glob.glob(os.path.join(STATIC, "assets", "*"))):
+        rel = os.path.relpath(src, STATIC).replace(os.sep, "/")
+        if rel not in refs and os.path.getsize(src) > 100 * 1024:
+            print(f"[build_images] não referenciado: {rel} ({os.path.getsize(src) / 1024:.0f} KB)")
+    sys.exit(1 if missing and check_only else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# scripts/build_static.py
+"""
+Build dos estáticos (ver app/static_assets.py):
+
+    python scripts/build_static.py
+
+Para cada arquivo de app/static (fora de dist/): cópia com hash do
+conteúdo no nome em app/static/dist/, .gz (e .br, se o pacote brotli
+estiver instalado) para os tipos de texto, e dist/manifest.json com o
+mapa nome original -> nome com hash. Builds antigos são descartados.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from app.static_assets import COMPRESSIBLE_EXTS, DIST_DIR, MANIFEST, VARIANTS_DIR  # noqa: E402
+
+STATIC = os.path.join(REPO_ROOT, "app", "static")
+MIN_COMPRESS_SIZE = 256
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def main():
+    dist = os.path.join(STATIC, DIST_DIR)
+    tmp = dist + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    brotli = _brotli()
+    manifest = {}
+    saved = 0
+
+    for root, dirs, files in os.walk(STATIC):
+        rel_root = os.path.relpath(root, STATIC)
+        # variants/ (scripts/build_images.py) já tem hash no nome
+        if rel_root.split(os.sep)[0] in (DIST_DIR, DIST_DIR + ".tmp", VARIANTS_DIR, VARIANTS_DIR + ".tmp"):
+            dirs[:] = []
+            continue
+        for name in sorted(files):
+            src = os.path.join(root, name)
+            rel = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(rel)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+            out = os.path.join(tmp, hashed)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, "wb") as f:
+                f.write(data)
+            manifest[rel] = hashed
+
+            if ext.lower() in COMPRESSIBLE_EXTS and len(data) >= MIN_COMPRESS_SIZE:
+                gz = gzip.compress(data, compresslevel=9, mtime=0)
+                with open(out + ".gz", "wb") as f:
+                    f.write(gz)
+                saved += len(data) - len(gz)
+                if brotli:
+                    with open(out + ".br", "wb") as f:
+                        f.write(brotli.compress(data, quality=11))
+
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.replace(tmp, dist)
+    print(f"[build_static] {len(manifest)} arquivo(s) em {dist}; gzip economiza {saved} bytes"
+          + ("" if brotli else " (brotli não instalado: sem .br)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# scripts/check_query_budgets.py
+"""
+Confere o orçamento de queries (@query_budget) de todas as rotas GET sem
+parâmetros (mais alguns exemplos), com os caches frios e depois quentes:
+
+    DATABASE_URL=sqlite:///dev.db python scripts/check_query_budgets.py [--default-budget 20]
+
+Usa o cliente de teste do Flask com QUERY_BUDGET_MODE=warn; rotas do admin
+com o usuário/senha da config. Sai com código 1 se alguma requisição passar
+do orçamento ou repetir o mesmo statement (N+1). Rode contra um banco de
+desenvolvimento com dados: sem linhas, um loop N+1 não aparece.
+"""
+import argparse
+import base64
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# rotas com efeito colateral ou dependência externa
+SKIP_ENDPOINTS = {"static", "site.health_supabase", "admin.admin_faq_init"}
+# exemplos para rotas com parâmetros/consulta
+EXTRA_PATHS = (
+    "/api/locations/search?q=a",
+    "/api/faq/search?q=caucao",
+    "/admin/legal/privacy",
+)
+
+
+def _paths(app) -> list[str]:
+    paths = []
+    for rule in app.url_map.iter_rules():
+        if "GET" in rule.methods and not rule.arguments and rule.endpoint not in SKIP_ENDPOINTS:
+            paths.append(rule.rule)
+    return sorted(paths) + list(EXTRA_PATHS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--default-budget", type=int, default=None,
+                        help="orçamento das rotas sem @query_budget")
+    args = parser.parse_args()
+
+    os.environ["QUERY_BUDGET_MODE"] = "warn"
+    os.environ["METRICS_ENABLED"] = "1"
+    if args.default_budget is not None:
+        os.environ["QUERY_BUDGET_DEFAULT"] = str(args.default_budget)
+
+    from app import create_app
+    from app.cache import clear_local
+    from app.page_cache import get_page_cache
+    from app.query_budget import violations
+
+    app = create_app()
+    client = app.test_client()
+    auth = "{}:{}".format(app.config.get("ADMIN_USERNAME", ""), app.config.get("ADMIN_PASSWORD", ""))
+    headers = {"Authorization": "Basic " + base64.b64encode(auth.encode()).decode()}
+
+    failed = []
+    print(f"{'rota':<42} {'frio':>5} {'quente':>6} {'orçam.':>6}")
+    for path in _paths(app):
+        with app.app_context():
+            clear_local()
+            page_cache = get_page_cache()
+            if page_cache:
+                page_cache.purge()
+        counts = []
+        budget = "-"
+        for _ in ("frio", "quente"):
+            resp = client.get(path, headers=headers if path.startswith("/admin") else None)
+            resp.close()
+            counts.append(resp.headers.get("X-Query-Count", "?"))
+            budget = resp.headers.get("X-Query-Budget", "-")
+        print(f"{path:<42} {counts[0]:>5} {counts[1]:>6} {budget:>6}")
+        for v in violations.drain():
+            failed.append(f"{path}: " + "; ".join(v["problems"]))
+
+    if failed:
+        print("\n[query-budget] FALHOU:")
+        for line in failed:
+            print("  " + line)
+        sys.exit(1)
+    print("\n[query-budget] ok")
+
+
+if __name__ == "__main__":
+    main()
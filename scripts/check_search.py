@@ -0,0 +1,54 @@
+# scripts/check_search.py
+"""
+Confere o stemming do fallback em memória da busca do FAQ (SQLite): o
+singular e o plural de cada par precisam cair no mesmo termo, e um índice
+montado com uma forma precisa achar o documento pela outra.
+
+    python scripts/check_search.py
+
+Não usa banco nem app. Sai com código 1 se algum par não casar.
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from app.search import InvertedIndex, terms  # noqa: E402
+
+# (singular, plural) como aparecem nas perguntas/respostas do FAQ
+PAIRS = (
+    ("caução", "cauções"),
+    ("cartão", "cartões"),
+    ("locação", "locações"),
+    ("inclusa", "inclusos"),
+    ("incluso", "inclusas"),
+    ("despesa", "despesas"),
+    ("curso", "cursos"),
+    ("carro", "carros"),
+    ("cliente", "clientes"),
+    ("seguro", "seguros"),
+    ("diária", "diárias"),
+    ("mês", "meses"),
+    ("booking", "bookings"),
+    ("reservation", "reservations"),
+)
+
+
+def main():
+    failed = 0
+    for singular, plural in PAIRS:
+        a, b = terms(singular), terms(plural)
+        index = InvertedIndex([(1, 0, [(singular, 1.0)]), (2, 0, [(plural, 1.0)])])
+        found = (index.search(plural), index.search(singular))
+        ok = a == b and found == ([1, 2], [1, 2])
+        if not ok:
+            failed += 1
+        print(f"{'OK ' if ok else 'ERR'} {singular} -> {a}  {plural} -> {b}  busca: {found}")
+    print(f"[check_search] {len(PAIRS) - failed}/{len(PAIRS)} pares ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
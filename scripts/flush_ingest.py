@@ -0,0 +1,111 @@
+# scripts/flush_ingest.py
+"""
+Descarrega a fila local de ingestão (INGEST_MODE=queue) no banco.
+
+    python scripts/flush_ingest.py                 # drena o que estiver pendente
+    python scripts/flush_ingest.py --requeue-dead  # devolve as linhas de 'dead' à fila antes
+    python scripts/flush_ingest.py --self-check    # lote misto (com/sem fingerprint) num sqlite temporário
+"""
+import os, sys, tempfile, time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+os.environ.setdefault("INGEST_MODE", "queue")
+
+if "--self-check" in sys.argv:
+    _tmp = tempfile.mkdtemp(prefix="mdy_ingest_check_")
+    os.environ["INGEST_MODE"] = "queue"
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "check.db")
+    os.environ["INGEST_QUEUE_PATH"] = os.path.join(_tmp, "queue.sqlite3")
+
+from wsgi import app  # noqa: E402
+
+
+def self_check(flusher) -> None:
+    """
+    Um lote com e sem fingerprint (telefone "N/A") nas duas ordens: o
+    executemany usa as colunas da primeira linha, então todas precisam delas.
+    Uma linha inválida num lote termina em 'dead' sem travar as outras.
+    """
+    from app.extensions import db
+    from app.ingest import submit
+    from app.migrations import upgrade
+    from app.models import QuoteRequest
+
+    base = dict(pickup_place="MCO", pickup_date="2030-01-10", drop_place="MCO",
+                drop_date="2030-01-15", category="SUV", status="novo")
+    with app.app_context():
+        upgrade(log=lambda *a: None)
+        flusher.batch_size = 2  # lotes (A,B), (C,D), (E,F), (G,H), (I,J)
+        flusher.queue.put("quote", "chk-fp-first-1", dict(
+            base, name="A", phone="+1 407 555 0101", fingerprint="a" * 40,
+            created_at="2030-01-01T00:00:00"))
+        # payloads antigos, sem a chave fingerprint, depois e antes de uma linha com ela
+        flusher.queue.put("quote", "chk-fp-first-2", dict(
+            base, name="B", phone="N/A", created_at="2030-01-01T00:00:01"))
+        flusher.queue.put("quote", "chk-fp-last-1", dict(
+            base, name="C", phone="whatsapp", created_at="2030-01-01T00:00:02"))
+        flusher.queue.put("quote", "chk-fp-last-2", dict(
+            base, name="D", phone="+1 407 555 0199", fingerprint="d" * 40,
+            created_at="2030-01-01T00:00:03"))
+        # e pelo caminho normal do submit
+        submit("quote", dict(base, name="E", phone="+1 407 555 0123"), fingerprint="e" * 40)
+        submit("quote", dict(base, name="F", phone="N/A"), fingerprint=None)
+        # StatementError (Date que não é data) não é "banco indisponível": vai para 'dead'
+        flusher.max_attempts = 1
+        flusher.queue.put("quote", "chk-bad-1", dict(
+            base, name="G", phone="N/A", pickup_on=20300110, created_at="2030-01-01T00:00:04"))
+        flusher.queue.put("quote", "chk-bad-2", dict(
+            base, name="H", phone="N/A", created_at="2030-01-01T00:00:05"))
+        # payload que nem vira linha (data impossível): vai para 'dead' sem travar J
+        flusher.queue.put("quote", "chk-poison-1", dict(
+            base, name="I", phone="N/A", pickup_on="2025-13-45", created_at="2030-01-01T00:00:06"))
+        flusher.queue.put("quote", "chk-poison-2", dict(
+            base, name="J", phone="N/A", created_at="2030-01-01T00:00:07"))
+        deadline = time.monotonic() + 10.0
+        # a thread do flusher (iniciada pelo submit) pode pegar parte dos lotes
+        while flusher.queue.depth()["pending"] and time.monotonic() < deadline:
+            if not flusher.drain(timeout=1.0):
+                time.sleep(0.1)
+        rows = dict(db.session.execute(
+            db.select(QuoteRequest.name, QuoteRequest.fingerprint)).all())
+
+    expected = {"A": "a" * 40, "B": None, "C": None, "D": "d" * 40, "E": "e" * 40, "F": None,
+                "H": None, "J": None}
+    ok = rows == expected and flusher.queue.depth() == {"pending": 0, "dead": 2}
+    print(f"[flush_ingest] self-check: {rows} {flusher.stats()}")
+    print("[flush_ingest] self-check", "OK" if ok else "FALHOU")
+    sys.exit(0 if ok else 1)
+
+
+def main():
+    flusher = app.extensions.get("ingest")
+    if flusher is None:
+        print("[flush_ingest] INGEST_MODE não é 'queue' neste ambiente; nada a fazer.")
+        sys.exit(1)
+
+    if "--self-check" in sys.argv:
+        self_check(flusher)
+
+    if "--requeue-dead" in sys.argv:
+        conn = flusher.queue._connect()
+        with flusher.queue._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            n = conn.execute(
+                "INSERT OR IGNORE INTO pending (kind, ingest_key, payload, enqueued_at) "
+                "SELECT kind, ingest_key, payload, enqueued_at FROM dead"
+            ).rowcount
+            conn.execute("DELETE FROM dead")
+            conn.execute("COMMIT")
+        print(f"[flush_ingest] {n} linha(s) devolvida(s) à fila")
+
+    print(f"[flush_ingest] fila: {flusher.queue.path} {flusher.queue.depth()}")
+    n = flusher.drain(timeout=float(os.environ.get("INGEST_DRAIN_TIMEOUT", "60")))
+    print(f"[flush_ingest] {n} linha(s) gravada(s); {flusher.stats()}")
+    sys.exit(0 if flusher.queue.depth()["pending"] == 0 else 2)
+
+
+if __name__ == "__main__":
+    main()
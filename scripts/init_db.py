@@ -22,7 +22,7 @@ def main():
     with app.app_context():
         # garanta que os models sejam importados
         try:
-            import app.models  # noqa: F401
+            from app import models  # noqa: F401  (não sombrear `app`)
         except Exception as e:
             print(f"[init_db] Aviso: não consegui importar app.models: {e}")
         # valida conexão antes
@@ -33,7 +33,15 @@ def main():
             print(f"[init_db] Conexão falhou: {e}")
             sys.exit(1)
 
-        db.create_all()
+        from app.migrations import SCHEMA_VERSION, current_schema_version, upgrade
+
+        if "--check" in sys.argv:
+            version = current_schema_version()
+            print(f"[init_db] schema no banco: {version} / esperado: {SCHEMA_VERSION}")
+            sys.exit(0 if version == SCHEMA_VERSION else 2)
+
+        # create_all + colunas novas em tabelas existentes + backfills
+        upgrade(log=print)
         print("✅ Tabelas criadas/atualizadas com sucesso.")
 
 if __name__ == "__main__":
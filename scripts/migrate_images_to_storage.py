@@ -0,0 +1,93 @@
+# scripts/migrate_images_to_storage.py
+"""
+Move as imagens das categorias da coluna featured_categories.image para o
+storage configurado (STORAGE_BACKEND=local|s3|supabase):
+
+    STORAGE_BACKEND=s3 STORAGE_S3_BUCKET=... python scripts/migrate_images_to_storage.py \
+        [--batch 20] [--keep-blobs] [--dry-run]
+
+Percorre as categorias em lotes por id (keyset), lendo um blob por vez: a
+memória fica no tamanho de uma imagem, não da tabela. Cada imagem vai para
+a chave do seu hash (repetidas são gravadas uma vez, junto com as larguras
+do grid), a linha recebe image_key e o blob é apagado; commit por lote, então
+dá para interromper e rodar de novo. --keep-blobs mantém a cópia no banco.
+No PostgreSQL, rode VACUUM featured_categories depois para devolver o espaço.
+"""
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch", type=int, default=20, help="categorias por commit")
+    parser.add_argument("--keep-blobs", action="store_true", help="não apaga o blob do banco")
+    parser.add_argument("--dry-run", action="store_true", help="só conta o que seria movido")
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+
+    from app import create_app
+    from app.cache import invalidate
+    from app.extensions import db
+    from app.routes import GRID_IMAGE_WIDTHS
+    from app.storage import get_store, store_image
+
+    app = create_app()
+    with app.app_context():
+        store = get_store()
+        if store is None:
+            print("[storage] STORAGE_BACKEND=db: defina local, s3 ou supabase")
+            sys.exit(2)
+
+        pending = text(
+            "SELECT id FROM featured_categories WHERE image IS NOT NULL AND image_key IS NULL"
+            " AND id > :after ORDER BY id LIMIT :n"
+        )
+        t0 = time.perf_counter()
+        moved = total_bytes = 0
+        after = 0
+        while True:
+            ids = db.session.execute(pending, {"after": after, "n": args.batch}).scalars().all()
+            if not ids:
+                break
+            after = ids[-1]
+            if args.dry_run:
+                moved += len(ids)
+                continue
+            for cid in ids:
+                data = db.session.execute(
+                    text("SELECT image FROM featured_categories WHERE id = :id"), {"id": cid}
+                ).scalar()
+                if not data:
+                    continue
+                fields = store_image(store, bytes(data), GRID_IMAGE_WIDTHS)
+                db.session.execute(
+                    text(
+                        "UPDATE featured_categories SET image_key = :image_key, image_hash = :image_hash,"
+                        " image_mime = :image_mime, image_size = :image_size"
+                        + ("" if args.keep_blobs else ", image = NULL")
+                        + " WHERE id = :id"
+                    ),
+                    {**fields, "id": cid},
+                )
+                moved += 1
+                total_bytes += fields["image_size"]
+            db.session.commit()
+            print(f"[storage] {moved} imagem(ns), {total_bytes / 1048576:.1f} MB (até id {after})")
+
+        if args.dry_run:
+            print(f"[storage] {moved} imagem(ns) a mover para {store.name}")
+            return
+        if moved:
+            invalidate("categories")
+        print(f"[storage] {moved} imagem(ns) em {store.name} em {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# scripts/profile_boot.py
+"""
+Mede o custo de cold start: import do pacote `app`, create_app() e a
+primeira requisição, cada rodada num interpretador novo.
+
+    python scripts/profile_boot.py [--runs 5] [--budget-ms 1500] [--request /health]
+
+Sai com código 1 se a mediana do total (import + create_app) passar do budget
+ou se algum módulo pesado (HEAVY_MODULES) for importado durante o boot.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# carregados sob demanda (app.extensions.get_supabase); não podem entrar no boot
+HEAVY_MODULES = (
+    "supabase", "httpx", "gotrue", "supabase_auth", "postgrest", "realtime", "storage3",
+    "PIL",
+)
+
+# executado em um processo novo a cada rodada (sem cache de módulos)
+PROBE = r"""
+import json, sys, time
+heavy = sys.argv[2].split(",")
+t0 = time.perf_counter()
+import app as pkg
+t1 = time.perf_counter()
+flask_app = pkg.create_app()
+t2 = time.perf_counter()
+path = sys.argv[1]
+if path:
+    flask_app.test_client().get(path)
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000 if path else None,
+    "modules": len(sys.modules),
+    "heavy": sorted(m for m in heavy if m in sys.modules),
+}))
+"""
+
+
+def run_once(path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, path, ",".join(HEAVY_MODULES)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--request", default="", help="path da primeira requisição (ex.: /health)")
+    args = parser.parse_args()
+
+    runs = [run_once(args.request) for _ in range(args.runs)]
+    report = {}
+    for key in ("import_ms", "create_app_ms", "first_request_ms"):
+        values = [r[key] for r in runs if r[key] is not None]
+        if values:
+            report[key] = {"median": round(statistics.median(values), 1), "max": round(max(values), 1)}
+    total = statistics.median(r["import_ms"] + r["create_app_ms"] for r in runs)
+    report["boot_total_ms"] = round(total, 1)
+    report["modules_loaded"] = runs[-1]["modules"]
+    report["heavy_modules_loaded"] = runs[-1]["heavy"]
+    print(json.dumps(report, indent=2))
+
+    if runs[-1]["heavy"]:
+        print(f"[profile_boot] ❌ módulos pesados importados no boot: {', '.join(runs[-1]['heavy'])}")
+        sys.exit(1)
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"[profile_boot] ❌ boot {total:.0f} ms > budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
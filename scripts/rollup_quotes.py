@@ -0,0 +1,25 @@
+# scripts/rollup_quotes.py
+"""
+Atualiza os rollups diários das cotações (app/analytics.py). Para cron:
+
+    python scripts/rollup_quotes.py          # incremental (watermark + últimos dias)
+    python scripts/rollup_quotes.py --full   # recalcula tudo
+"""
+import os, sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from wsgi import app  # noqa: E402
+
+
+def main():
+    from app.analytics import refresh_rollups
+
+    with app.app_context():
+        refresh_rollups(full="--full" in sys.argv, log=print)
+
+
+if __name__ == "__main__":
+    main()